@@ -0,0 +1,117 @@
+from typing import Any
+import numpy as np
+import pandas as pd
+
+
+class AggregationCube:
+    """This class holds the sums and counts of every numeric column per
+    cell of two key columns (Human_development x ISO by default)
+
+    The cube is built in one pass: the rows are sorted by cell once and
+    every column is reduced over the same cell boundaries. Sums, means and
+    counts of any cell, row or column of the grid are then read from it
+    without going back to the frame."""
+
+    FUNCS: tuple = ("sum", "mean", "count")
+
+    def __init__(self, df: pd.DataFrame, index: str = "Human_development",
+                 columns: str = "ISO"):
+        numeric = df.select_dtypes("number")
+        row_codes, row_labels = pd.factorize(df[index], sort=True)
+        col_codes, col_labels = pd.factorize(df[columns], sort=True)
+        if isinstance(row_labels, pd.CategoricalIndex):  # Keep every level
+            row_codes = df[index].cat.codes.to_numpy()
+            row_labels = df[index].cat.categories
+        cells = row_codes.astype(np.int64) * len(col_labels) + col_codes
+        order = np.argsort(cells, kind="stable")
+        cells = cells[order]
+        values = numeric.to_numpy(dtype=np.float64)[order]
+        present = ~np.isnan(values)
+
+        # Reduce every column over the runs of equal cells at once
+        starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]]) \
+            if len(cells) else np.empty(0, dtype=np.int64)
+        shape = (len(row_labels) * len(col_labels), numeric.shape[1])
+        sums, counts = np.zeros(shape), np.zeros(shape, dtype=np.int64)
+        if len(starts):
+            sums[cells[starts]] = np.add.reduceat(
+                np.where(present, values, 0.0), starts, axis=0)
+            counts[cells[starts]] = np.add.reduceat(present, starts, axis=0)
+
+        # Set the attributes
+        self.index: pd.Index = pd.Index(row_labels, name=index)  # Grid rows
+        self.columns: pd.Index = pd.Index(col_labels, name=columns)
+        self.names: list = list(numeric.columns)  # Numeric columns
+        self.positions: dict = {name: i for i, name in enumerate(self.names)}
+        self.sums: np.ndarray = sums.reshape(len(row_labels),
+                                             len(col_labels), shape[1])
+        self.counts: np.ndarray = counts.reshape(self.sums.shape)
+
+    def get_cells(self, column: str, axis: Any = None) -> tuple:
+        """Get the sums and counts of a column, summed over an axis of the
+        grid (0 for columns, 1 for rows, (0, 1) for the whole column)"""
+
+        if column not in self.positions:
+            raise KeyError(f"{column} is not a numeric column")
+        position = self.positions[column]
+        sums = self.sums[:, :, position]
+        counts = self.counts[:, :, position]
+        if axis is not None:
+            sums, counts = sums.sum(axis=axis), counts.sum(axis=axis)
+        return sums, counts
+
+    def reduce(self, sums: np.ndarray, counts: np.ndarray,
+               func: str) -> np.ndarray:
+        """Turn sums and counts into a sum, mean or count, the mean of a
+        cell without values is NaN and its sum 0 like in pandas"""
+
+        if func not in self.FUNCS:
+            raise ValueError(f"Unknown aggregation {func}, use "
+                             f"{', '.join(self.FUNCS)}")
+        if func == "sum":
+            return sums.copy()
+        if func == "count":
+            return counts.copy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, sums / counts, np.nan)
+
+    def get_table(self, column: str, func: str = "sum") -> pd.DataFrame:
+        """Get a column aggregated per cell, like a pivot table"""
+
+        return pd.DataFrame(self.reduce(*self.get_cells(column), func),
+                            index=self.index, columns=self.columns)
+
+    def get_index_totals(self, column: str,
+                         func: str = "sum") -> pd.Series:
+        """Get a column aggregated per grid row, like a groupby of the
+        index column"""
+
+        return pd.Series(self.reduce(*self.get_cells(column, 1), func),
+                         index=self.index, name=column)
+
+    def get_column_totals(self, column: str,
+                          func: str = "mean") -> pd.Series:
+        """Get a column aggregated per grid column, like a groupby of the
+        columns column"""
+
+        return pd.Series(self.reduce(*self.get_cells(column, 0), func),
+                         index=self.columns, name=column)
+
+    @staticmethod
+    def top_k(series: pd.Series, k: int) -> list:
+        """Get the labels of the k largest values, largest first and equal
+        values in index order, with a partial selection instead of a full
+        sort"""
+
+        values = series.to_numpy(dtype=np.float64)
+        values = np.where(np.isnan(values), -np.inf, values)  # NaN last
+        if k <= 0:
+            return []
+        top = np.arange(len(values))
+        if k < len(values):
+            # Every value tied with the k-th largest is a candidate, the
+            # first ones in index order are kept
+            kth = values[np.argpartition(-values, k - 1)[k - 1]]
+            top = np.flatnonzero(values >= kth)
+        top = top[np.lexsort((top, -values[top]))][:k]
+        return series.index[top].tolist()
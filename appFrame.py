@@ -1,9 +1,16 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from tkinter import filedialog
 from typing import Optional, Any
+import os
 import customtkinter as ct
+import numpy as np
 from PIL import Image
 from plotFrame import PlotFrame
+from treeTable import TreeTable
 from facadeController import FacadeController
 
+PREDICT_POLL_MS: int = 50  # Check for a finished prediction every 50 ms
+
 
 class AppFrame(ct.CTkFrame):
     """App frame"""
@@ -187,6 +194,10 @@ class WindowSubFrame(ct.CTkScrollableFrame):
         self.header_lbl: Optional[ct.CTkLabel] = None  # Header label
         self.text_lbl: Optional[ct.CTkLabel] = None  # Text label
         self.plot_frame: Optional[PlotFrame] = None  # Plot frame
+        self.predict_lbl: Optional[ct.CTkLabel] = None  # Predicted value
+        self.predict_job: Optional[Future] = None  # Latest prediction
+        self.predict_worker: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1)  # Bootstraps the interval off the Tk thread
 
         # Manage the grid
         self.configure(border_color="gray", border_width=1)
@@ -228,6 +239,7 @@ class WindowSubFrame(ct.CTkScrollableFrame):
         stat_text = self.facade.get_statistic()
         corr_text = self.facade.get_corr_text()
         warn_text = self.facade.get_warning_text()
+        unresolved_text = self.facade.get_unresolved_text()
 
         # Create the images
         img_2 = self.facade.get_graph_img_path("GII_his.png")
@@ -242,6 +254,10 @@ class WindowSubFrame(ct.CTkScrollableFrame):
                                       font=self.facade.create_font(25))
 
         self.header_lbl.grid(row=0, column=0, padx=20, pady=30, sticky="nsew")
+        if unresolved_text:  # Countries the country index did not match
+            self.facade.create_text_lbl(self, text=unresolved_text, size=16,
+                                        row=1, wraplength=660,
+                                        text_color="#FB2576")
         self.facade.create_text_lbl(self, text=warn_text, size=16, row=2,
                                     wraplength=660)
 
@@ -456,6 +472,14 @@ class WindowSubFrame(ct.CTkScrollableFrame):
                                command=lambda: self.create_predict_label(var),
                                row=5,
                                column=0, size=18, sticky="nsew")
+        self.facade.create_btn(self.input_frame, text="Score a file",
+                               command=lambda: self.create_score_label(var),
+                               row=6,
+                               column=0, size=18, sticky="nsew")
+        self.facade.create_btn(self.input_frame, text="Search models",
+                               command=lambda: self.create_search_window(var),
+                               row=7,
+                               column=0, size=18, sticky="nsew")
 
     def create_predict_label(self, model: str = "") -> None:
         """Create the predicted value label"""
@@ -466,11 +490,77 @@ class WindowSubFrame(ct.CTkScrollableFrame):
             self.values.update({"input1": float(self.entry1.get()),
                                 "input2": float(self.entry2.get()),
                                 "input3": float(self.entry3.get())})
-        value = self.facade.regression(model, self.options, self.values)
-        self.facade.create_text_lbl(self.input_frame, text="Predicted value:",
-                                    row=5, column=1, size=18)
-        self.facade.create_text_lbl(self.input_frame, text=value,
-                                    row=5, column=2, size=18)
+        job = self.predict_worker.submit(self.facade.regression_interval,
+                                         model, dict(self.options),
+                                         dict(self.values))
+        self.predict_job = job
+        if self.predict_lbl is None or not self.predict_lbl.winfo_exists():
+            self.facade.create_text_lbl(self.input_frame,
+                                        text="Predicted value:",
+                                        row=5, column=1, size=18)
+            self.predict_lbl = ct.CTkLabel(
+                self.input_frame, anchor="s",
+                font=ct.CTkFont(family="Mali", size=18, weight="bold"))
+            self.predict_lbl.grid(row=5, column=2, padx=30, pady=30,
+                                  sticky="nsew")
+        self.predict_lbl.configure(text="Computing...")
+        self.after(PREDICT_POLL_MS, lambda: self.poll_predict(job))
+
+    def poll_predict(self, job: Future) -> None:
+        """Show a prediction once it is computed, unless a newer one was
+        asked for meanwhile"""
+
+        if job is not self.predict_job or not self.predict_lbl.winfo_exists():
+            return
+        if not job.done():
+            self.after(PREDICT_POLL_MS, lambda: self.poll_predict(job))
+            return
+        try:
+            value, lower, upper, cv_rmse = job.result()
+            text = f"{value}\n95% CI [{lower}, {upper}]\nCV RMSE {cv_rmse}"
+        except (KeyError, ValueError) as error:
+            text = f"Cannot predict: {error}"
+        self.predict_lbl.configure(text=text)
+
+    def create_score_label(self, model: str = "") -> None:
+        """Score every row of a chosen CSV file and show where it went"""
+
+        path = filedialog.askopenfilename(title="Choose a CSV file to score",
+                                          filetypes=[("CSV files", "*.csv")])
+        if not path:
+            return
+        try:
+            out_path, rows = self.facade.score_file(model, self.options, path)
+            text = f"{rows} rows -> {os.path.basename(out_path)}"
+        except (KeyError, ValueError, OSError) as error:
+            text = f"Cannot score: {error}"
+        self.facade.create_text_lbl(self.input_frame, text="Scored file:",
+                                    row=6, column=1, size=18)
+        self.facade.create_text_lbl(self.input_frame, text=text,
+                                    row=6, column=2, size=18)
+
+    def create_search_window(self, model: str = "") -> None:
+        """Open a window with the ranked models of the selected target"""
+
+        max_size = 1 if model == "Simple Linear Regression" else 3
+        try:
+            table = self.facade.search_models(self.options["target"],
+                                              max_size=max_size)
+        except (KeyError, ValueError) as error:
+            self.facade.create_text_lbl(self.input_frame,
+                                        text=f"Cannot search: {error}",
+                                        row=7, column=1, size=18)
+            return
+        rows = table.round(4).to_numpy(dtype=object)
+
+        window = ct.CTkToplevel(self)
+        window.title(f"Models of {self.options['target']}")
+        tree = TreeTable(window)
+        tree.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
+        tree.scrollbar.grid(row=0, column=1, pady=10, sticky="ns")
+        tree.set_data(tuple(table.columns), np.arange(len(rows)),
+                      lambda ids: rows[ids].tolist())  # Tk splits arrays
+        tree.column("Inputs", width=420, anchor="w")
 
     def enter_tab_view(self, page: int = 2) -> None:
         """Enter the tab view"""
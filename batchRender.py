@@ -0,0 +1,204 @@
+"""Render every graph of the Plot tab to image files, without a window.
+
+Every plot type of the Distribution, Everyday, Correlation and Network
+graphs is drawn for every column (every pair of columns for the
+correlation plots) on the Agg backend, by a pool of worker processes. An
+output is skipped while the hash of its plot spec, the data files, the
+code and the plotting libraries matches the one in the manifest of the
+output directory.
+
+Usage:
+    python batchRender.py [-o OUTPUT] [-j WORKERS] [--sample N] [--force]
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, Optional
+import matplotlib
+
+matplotlib.use("Agg")
+import networkx as nx  # noqa: E402
+import pandas as pd  # noqa: E402
+import seaborn as sns  # noqa: E402
+from matplotlib import pyplot as plt  # noqa: E402
+from commonWidget import CommonWidget  # noqa: E402
+from facadeController import FacadeController  # noqa: E402
+from graphPlotter import GraphPlotter  # noqa: E402
+from plotCache import PlotCache  # noqa: E402
+from renderPipeline import RenderJob, RenderPipeline  # noqa: E402
+
+ROOT: str = os.path.dirname(os.path.realpath(__file__))
+OUTPUT_DIR: str = os.path.join(ROOT, "misc", "graph", "batch")  # Default
+MANIFEST: str = "manifest.json"  # Output name -> hash, in the output dir
+FIGSIZE: tuple = (7, 5)  # Same size as the Plot tab
+HEATMAP_METHODS: list = ["Pearson", "Spearman"]
+
+_plotter: Optional[GraphPlotter] = None  # Of the worker process
+_pipeline: Optional[RenderPipeline] = None  # Figure of the worker process
+
+
+def get_facade() -> FacadeController:
+    """Get a facade without the music of the window"""
+
+    CommonWidget.music_state = True
+    return FacadeController()
+
+
+def get_content_key() -> str:
+    """Hash the data files, the code and the plotting library versions,
+    any change to them makes every output out of date"""
+
+    digest = hashlib.sha1()
+    paths = sorted(glob.glob(os.path.join(ROOT, "data", "*.csv"))
+                   + glob.glob(os.path.join(ROOT, "*.py")))
+    for path in paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    for module in (matplotlib, nx, pd, sns):
+        digest.update(f"{module.__name__}={module.__version__}".encode())
+    return digest.hexdigest()
+
+
+def get_jobs(facade: FacadeController, sample: str) -> Iterator[tuple]:
+    """Get (name, graph, options) of every plot type and column"""
+
+    columns = list(facade.get_columns()[2:-1])  # As in the Plot tab menus
+    for plot in facade.get_dis_plot():
+        for column in columns:
+            yield f"dis_{plot}_{column}", "Distribution", \
+                {"Plot": plot, "Column": column}
+    for plot in facade.get_every_plot():
+        for column in columns:
+            yield f"everyday_{plot}_{column}", "Everyday", \
+                {"Plot": plot, "Column": column}
+    for plot in facade.get_corr_plot():
+        if plot == "heatmap":
+            for method in HEATMAP_METHODS:
+                yield f"corr_heatmap_{method.lower()}", "Correlation", \
+                    {"Plot": plot, "Method": method}
+            continue
+        for column1 in columns:
+            for column2 in columns:
+                if column1 != column2:
+                    yield f"corr_{plot}_{column1}_{column2}", \
+                        "Correlation", {"Plot": plot, "Column1": column1,
+                                        "Column2": column2}
+    for layout in facade.get_network_plot():
+        for column in columns:
+            # A fixed seed draws the same countries in every run
+            yield f"network_{layout}_{column}", "Network", \
+                {"NPlot": layout, "Column1": column, "Sample": sample,
+                 "Seed": 0}
+
+
+def load_manifest(directory: str) -> dict:
+    """Get the hashes of the outputs rendered before"""
+
+    try:
+        with open(os.path.join(directory, MANIFEST)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_file(path: str, write, mode: str = "wb") -> None:
+    """Write a file through a temporary file, a reader never sees half of
+    it"""
+
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, mode) as file:
+            write(file)
+        os.replace(temp, path)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def init_worker() -> None:
+    """Load the dataset once per worker process"""
+
+    global _plotter, _pipeline
+    _plotter = GraphPlotter(get_facade())
+    _pipeline = RenderPipeline(figsize=FIGSIZE)
+
+
+def render_file(graph: str, options: dict, path: str) -> str:
+    """Render one graph to a PNG file, in a worker process"""
+
+    prepare, draw, *_ = _plotter.get_graph(graph, options)
+    image = _pipeline.rasterize(RenderJob(prepare, draw))
+    plt.close("all")  # Figures some library opened through pyplot
+    write_file(path, lambda file: image.save(file, format="PNG"))
+    return path
+
+
+def main(argv: list = None) -> int:
+    """Render the out of date graphs, the exit status is 1 if one failed"""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default=OUTPUT_DIR,
+                        help="directory of the images")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="worker processes, one per CPU by default")
+    parser.add_argument("--sample", default="15",
+                        choices=FacadeController.get_network_samples(),
+                        help="countries in the network graphs")
+    parser.add_argument("--force", action="store_true",
+                        help="render the up to date images too")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output, exist_ok=True)
+    facade = get_facade()
+    plotter = GraphPlotter(facade)
+    content_key = get_content_key()
+    manifest = load_manifest(args.output)
+
+    # Keep the jobs whose image is missing or was rendered from other inputs
+    jobs, graphs = [], 0
+    for name, graph, options in get_jobs(facade, args.sample):
+        graphs += 1
+        path = os.path.join(args.output, f"{name}.png")
+        _, _, spec, palette, _ = plotter.get_graph(graph, options,
+                                                   content_key)
+        key = PlotCache.get_key((*spec, palette))
+        if args.force or manifest.get(name) != key \
+                or not os.path.exists(path):
+            jobs.append((name, graph, options, path, key))
+    total = len(jobs)
+    print(f"{total} graphs to render, {graphs - total} up to date")
+
+    failed = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=args.workers,
+                                 initializer=init_worker) as pool:
+            futures = {pool.submit(render_file, graph, options, path):
+                       (name, key) for name, graph, options, path, key in jobs}
+            for done, future in enumerate(as_completed(futures), 1):
+                name, key = futures[future]
+                try:
+                    future.result()
+                    manifest[name] = key
+                except Exception as error:  # One graph does not stop others
+                    manifest.pop(name, None)
+                    failed.append(name)
+                    print(f"{name} failed: {error}", file=sys.stderr)
+                if done % 50 == 0 or done == total:
+                    print(f"{done}/{total} rendered")
+
+    write_file(os.path.join(args.output, MANIFEST),
+               lambda file: json.dump(manifest, file, indent=1,
+                                      sort_keys=True), mode="w")
+    print(f"{total - len(failed)} rendered, {len(failed)} failed, images in "
+          f"{args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
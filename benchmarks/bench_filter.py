@@ -0,0 +1,67 @@
+"""Benchmark the compiled filter engine against DataFrame.query.
+
+Run from the repository root:
+    python benchmarks/bench_filter.py [rows]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from filterEngine import FilterIndex, run_filter  # noqa: E402
+from model import Analysis  # noqa: E402
+
+QUERIES = [
+    "ISO in ['ISL','SWE'] or 0.05 > GII > 0.01",
+    "GII > 0.5",
+    "Human_development == 'Low' and 10 < Seats_parliament <= 30",
+    "Country in ['Norway', 'Chad'] or not Rank < 150",
+]
+
+
+def make_synthetic(rows: int) -> pd.DataFrame:
+    """Resample the prepared rows into a large panel"""
+
+    rng = np.random.default_rng(0)
+    df = Analysis().df
+    df = df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True)
+    for column in df.select_dtypes("number").columns:
+        df[column] *= rng.uniform(0.9, 1.1, rows).astype("float32")
+    return df
+
+
+def best_of(func, repeat: int = 5) -> float:
+    """Fastest of a few runs"""
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(rows: int = 1_000_000) -> None:
+    """Time every query both ways and check they agree"""
+
+    df = make_synthetic(rows)
+    index = FilterIndex(df)
+    start = time.perf_counter()
+    for query in QUERIES:  # Build the column indexes once
+        run_filter(query, index)
+    print(f"{rows:,} rows, indexes built in "
+          f"{time.perf_counter() - start:.3f} s")
+
+    for query in QUERIES:
+        expected = np.flatnonzero(df.index.isin(df.query(query).index))
+        assert np.array_equal(run_filter(query, index), expected), query
+        old = best_of(lambda: df.query(query))
+        new = best_of(lambda: run_filter(query, index))
+        print(f"{query:<60} query {old:7.4f} s  engine {new:7.4f} s  "
+              f"{old / new:5.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
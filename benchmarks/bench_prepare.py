@@ -0,0 +1,65 @@
+"""Benchmark the prepare/display pipeline on a 1M-row synthetic dataset.
+
+Run from the repository root:
+    python benchmarks/bench_prepare.py [rows]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model import DATA_PATH, round_values  # noqa: E402
+
+
+def legacy_prepare(df: pd.DataFrame) -> pd.DataFrame:
+    """The per-cell string round trip prepare_data used to run"""
+
+    df = df.applymap(lambda x: f'{x:.2f}' if isinstance(x, float) else x)
+    return df.astype({column: "float32" for column in df.columns[2:-1]})
+
+
+def make_synthetic(rows: int) -> pd.DataFrame:
+    """Resample the real rows and jitter the numbers"""
+
+    rng = np.random.default_rng(0)
+    df = pd.read_csv(DATA_PATH).dropna()
+    df = df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True)
+    for column in df.select_dtypes("number").columns:
+        df[column] = df[column] * rng.uniform(0.9, 1.1, rows)
+    df["ISO"] = "XXX"
+    return df
+
+
+def timed(label: str, func, *args) -> tuple:
+    """Run func once and print how long it took"""
+
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28}{elapsed:8.3f} s")
+    return result, elapsed
+
+
+def main(rows: int = 1_000_000) -> None:
+    """Compare the legacy and vectorized pipelines"""
+
+    df = make_synthetic(rows)
+    print(f"{rows:,} rows")
+    old, old_time = timed("applymap + astype", legacy_prepare, df)
+    new, new_time = timed("round_values", lambda: df.assign(
+        **{column: round_values(df[column]).astype("float32")
+           for column in df.columns[2:-1]}))
+    pd.testing.assert_frame_equal(old, new)
+
+    shown_old, _ = timed("display applymap", lambda: old.applymap(
+        lambda x: float(f'{x:.2f}') if isinstance(x, float) else x))
+    shown_new, _ = timed("display round_values", lambda: new.assign(
+        **{column: round_values(new[column]) for column in new.columns[2:-1]}))
+    pd.testing.assert_frame_equal(shown_old, shown_new)
+    print(f"identical output, {old_time / new_time:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,65 @@
+"""Benchmark Gram matrix OLS fits against LinearRegression.fit.
+
+Run from the repository root:
+    python benchmarks/bench_regression.py [rows]
+"""
+import itertools
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model import Analysis  # noqa: E402
+from regressionEngine import GramMatrix  # noqa: E402
+
+
+def make_synthetic(rows: int) -> pd.DataFrame:
+    """Resample the prepared rows and jitter the numbers"""
+
+    rng = np.random.default_rng(0)
+    df = Analysis().df
+    df = df.iloc[rng.integers(0, len(df), rows)].reset_index(drop=True)
+    for column in df.select_dtypes("number").columns:
+        df[column] *= rng.uniform(0.9, 1.1, rows).astype("float32")
+    return df
+
+
+def main(rows: int = 1_000_000) -> None:
+    """Fit every target on every 1-3 column subset both ways"""
+
+    df = make_synthetic(rows)
+    columns = list(df.select_dtypes("number").columns)
+    fits = [(target, inputs) for target in columns
+            for size in (1, 2, 3)
+            for inputs in itertools.combinations(
+                [c for c in columns if c != target], size)]
+    print(f"{rows:,} rows, {len(fits)} fits")
+
+    start = time.perf_counter()
+    gram = GramMatrix(df)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    solved = [gram.fit(target, inputs) for target, inputs in fits]
+    solve = time.perf_counter() - start
+    print(f"Gram matrix built in {build:.3f} s, "
+          f"{solve / len(fits) * 1e6:.0f} us per fit")
+
+    sample = fits[::len(fits) // 20]  # sklearn is too slow for all of them
+    start = time.perf_counter()
+    for target, inputs in sample:
+        model = LinearRegression().fit(df[list(inputs)], df[target])
+        fit = solved[fits.index((target, inputs))]
+        np.testing.assert_allclose(fit.coef_, model.coef_, rtol=1e-4,
+                                   atol=1e-6)
+        np.testing.assert_allclose(fit.intercept_, model.intercept_,
+                                   rtol=1e-4, atol=1e-5)
+    per_fit = (time.perf_counter() - start) / len(sample)
+    print(f"LinearRegression.fit {per_fit * 1e3:.1f} ms per fit, "
+          f"{per_fit * len(fits) / (build + solve):.0f}x slower for all fits")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
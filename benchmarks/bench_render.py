@@ -0,0 +1,91 @@
+"""Measure how responsive the main thread stays while a plot renders.
+
+A large scatter plot goes through the render pipeline while the main thread
+ticks at 60 fps like the Tk event loop, the gaps between ticks are reported.
+Then three plots are submitted at once, only the last one must be drawn,
+and the scatter plot is recoloured in place with other palettes. A
+recolour rasterizes the markers again, so it grows with the points and is
+not sub-frame for large plots.
+
+Run from the repository root:
+    python benchmarks/bench_render.py [points]
+"""
+import os
+import sys
+import time
+import matplotlib
+
+matplotlib.use("Agg")
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import seaborn as sns  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from renderPipeline import RenderPipeline  # noqa: E402
+
+FRAME: float = 1 / 60  # Tick of the simulated event loop
+PALETTES: list = [("#39B5E0", "#FB2576", "#C9F4AA", "#F5EA5A"),
+                  ("#112233", "#AA0000", "#00AA55", "#7700FF")]
+
+
+def make_synthetic(points: int) -> pd.DataFrame:
+    """Random points in four groups"""
+
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"x": rng.normal(size=points),
+                         "y": rng.normal(size=points),
+                         "group": rng.choice(list("ABCD"), points)})
+
+
+def scatter(figure, df: pd.DataFrame, palette: tuple = PALETTES[0]) -> None:
+    """Draw a seaborn scatter plot of every point"""
+
+    sns.scatterplot(data=df, x="x", y="y", hue="group", s=4, linewidth=0,
+                    hue_order=list("ABCD"), palette=list(palette),
+                    ax=figure.add_subplot())
+
+
+def main(points: int = 500_000) -> None:
+    """Render a large scatter plot while ticking at 60 fps"""
+
+    df = make_synthetic(points)
+    pipeline = RenderPipeline()
+
+    job = pipeline.submit(lambda: df, scatter)
+    start = last = time.perf_counter()
+    gaps = []
+    while not job.future.done():
+        time.sleep(FRAME)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+    image = pipeline.get_result(job)
+    gaps = np.array(gaps) * 1000
+    print(f"{points:,} points rendered to {image.size} in "
+          f"{time.perf_counter() - start:.2f} s, {len(gaps)} ticks, "
+          f"gap median {np.median(gaps):.1f} ms, "
+          f"p99 {np.percentile(gaps, 99):.1f} ms, max {gaps.max():.1f} ms")
+
+    jobs = [pipeline.submit(lambda: df.iloc[:points // 10], scatter)
+            for _ in range(3)]
+    results = [pipeline.get_result(job) for job in jobs]
+    print(f"3 plots submitted at once, drawn: "
+          f"{[result is not None for result in results]}")
+
+    times = []
+    for palette in PALETTES * 3:
+        start = time.perf_counter()
+        pipeline.get_result(pipeline.submit(
+            lambda: df, lambda figure, data, palette=palette: scatter(
+                figure, data, palette), ("scatter", points), palette,
+            lambda figure, palette: scatter(figure, df, palette)))
+        times.append((time.perf_counter() - start) * 1000)
+    print(f"{points:,} points drawn in {times[0]:.0f} ms, recoloured in "
+          f"{np.median(times[1:]):.0f} ms (median of {len(times) - 1}, "
+          f"the first one also finds the palette colours in {times[1]:.0f} "
+          f"ms)")
+    pipeline.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
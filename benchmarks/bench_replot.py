@@ -0,0 +1,105 @@
+"""Re-plot every graph type many times and check that memory stays flat.
+
+The PlotFrame plot methods run without a window, both stages of the render
+pipeline run in place instead of on the render worker.
+
+Run from the repository root:
+    python benchmarks/bench_replot.py [rounds]
+"""
+import gc
+import os
+import sys
+import time
+import matplotlib
+
+try:
+    import resource
+except ImportError:  # Windows, only the object count is checked
+    resource = None
+
+matplotlib.use("Agg")
+from matplotlib import pyplot as plt  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from commonWidget import CommonWidget  # noqa: E402
+from facadeController import FacadeController  # noqa: E402
+from graphPlotter import GraphPlotter  # noqa: E402
+from plotFrame import PlotFrame  # noqa: E402
+from renderPipeline import RenderJob, RenderPipeline  # noqa: E402
+
+PLOTS: list = [  # (plot method, options)
+    ("plot_dis_graph", {"Plot": "histplot", "Column": "GII"}),
+    ("plot_dis_graph", {"Plot": "boxplot", "Column": "Rank"}),
+    ("plot_everyday_graph", {"Plot": "pie", "Column": "GII"}),
+    ("plot_everyday_graph", {"Plot": "stackbar", "Column": "GII"}),
+    ("plot_corr_graph", {"Plot": "scatterplot"}),
+    ("plot_corr_graph", {"Plot": "heatmap", "Method": "Spearman"}),
+    ("plot_network_graph", {"Sample": "15"}),
+    ("plot_similarity_graph", {"Neighbours": "5"}),
+]
+
+
+class HeadlessPlotFrame(PlotFrame):
+    """PlotFrame plot methods on the render pipeline, without a Tk window"""
+
+    def __init__(self):  # The Tk window is never created
+        CommonWidget.music_state = True  # No music without a window
+        self._facade = FacadeController()
+        self.options = {}
+        self.df = self.facade.get_df()
+        self.plotter = GraphPlotter(self.facade)
+        self.tree_query = ""
+        self.network_seed = 0
+        self.pipeline = RenderPipeline(figsize=(7, 5))
+        self.image = None
+
+    def render(self, prepare, draw, spec=None, palette=None,
+               redraw=None) -> None:
+        """Run both render stages in place, there is no event loop, plots
+        are not cached so that each round draws them again"""
+
+        self.image = self.pipeline.render(RenderJob(prepare, draw))
+        plt.close("all")
+
+
+def replot(frame: HeadlessPlotFrame) -> None:
+    """Draw every graph type once"""
+
+    for method, options in PLOTS:
+        frame.options = dict(options)
+        getattr(frame, method)()
+
+
+def main(rounds: int = 100) -> None:
+    """Re-plot every graph type rounds times, compare memory over time"""
+
+    frame = HeadlessPlotFrame()
+    for _ in range(5):  # Warm up fonts, caches and layouts
+        replot(frame)
+
+    start = time.perf_counter()
+    samples = []
+    for round_ in range(1, rounds + 1):
+        replot(frame)
+        if round_ % max(rounds // 5, 1) == 0:
+            gc.collect()
+            # Peak resident set, kB on Linux
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 \
+                if resource else 0.0
+            samples.append((len(gc.get_objects()), peak))
+            print(f"{round_:5d} rounds: {samples[-1][0]:,} objects, "
+                  f"{peak:.0f} MiB peak RSS, "
+                  f"{len(plt.get_fignums())} pyplot figures open")
+    elapsed = time.perf_counter() - start
+    print(f"{rounds * len(PLOTS)} plots in {elapsed:.1f} s")
+
+    objects = samples[-1][0] - samples[0][0]
+    peak = samples[-1][1] - samples[0][1]
+    print(f"Growth after the first sample: {objects:,} objects, "
+          f"{peak:.0f} MiB peak RSS")
+    if plt.get_fignums() or objects > 10_000 or peak > 20:
+        sys.exit("Re-plotting leaks memory")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
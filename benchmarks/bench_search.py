@@ -0,0 +1,48 @@
+"""Benchmark the all-subsets model search, in process and on a pool.
+
+Run from the repository root:
+    python benchmarks/bench_search.py [rows] [columns]
+"""
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from regressionEngine import FoldMoments, search_subsets  # noqa: E402
+
+
+def make_synthetic(rows: int, columns: int = 40) -> pd.DataFrame:
+    """Random indicators with a target driven by three of them"""
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(rows, columns)),
+                      columns=[f"x{i}" for i in range(columns)])
+    df["y"] = 2 * df["x1"] + df["x5"] - df["x9"] + rng.normal(size=rows)
+    return df
+
+
+def main(rows: int = 1_000_000, columns: int = 40) -> None:
+    """Score every subset of up to three columns with 5-fold CV"""
+
+    df = make_synthetic(rows, columns)
+    start = time.perf_counter()
+    moments = FoldMoments(df, folds=5)
+    print(f"{rows:,} rows, moments of 5 folds in "
+          f"{time.perf_counter() - start:.3f} s")
+
+    for max_size in (3, 4):
+        timings = []
+        for workers in (1, None):
+            start = time.perf_counter()
+            table = search_subsets(moments, "y", moments.columns, max_size,
+                                   workers=workers)
+            timings.append(time.perf_counter() - start)
+        print(f"{len(table):,} models up to {max_size} columns: "
+              f"{timings[0]:.2f} s in process, {timings[1]:.2f} s on a pool, "
+              f"best {table['Inputs'].iloc[0]}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
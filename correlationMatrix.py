@@ -0,0 +1,80 @@
+import threading
+from typing import Any
+import numpy as np
+import pandas as pd
+
+
+class CorrelationMatrix:
+    """This class holds the Pearson or Spearman correlations of the
+    numeric columns of a frame
+
+    Every column is turned once into a centered unit vector (of its ranks
+    for Spearman), a correlation is then the dot product of two vectors.
+    Columns are added when they are first asked for, so a new selection
+    only computes the rows and columns of the matrix it did not have."""
+
+    METHODS: tuple = ("pearson", "spearman")
+
+    def __init__(self, df: pd.DataFrame, method: str = "pearson"):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown correlation method {method}, use "
+                             f"{' or '.join(self.METHODS)}")
+
+        # Set the attributes
+        self.df: pd.DataFrame = df.select_dtypes("number")  # Source columns
+        self.method: str = method  # pearson or spearman
+        self.columns: list = []  # Columns in the matrix, in matrix order
+        self.positions: dict = {}  # column -> matrix position
+        self.vectors: np.ndarray = np.empty((len(self.df), 0))  # Unit columns
+        self.matrix: np.ndarray = np.empty((0, 0))  # Correlations so far
+        self._lock: threading.Lock = threading.Lock()
+
+    def get(self, columns: Any = None) -> pd.DataFrame:
+        """Get the correlations between columns, every numeric column by
+        default"""
+
+        columns = list(self.df.columns) if columns is None else list(columns)
+        with self._lock:
+            missing = [column for column in dict.fromkeys(columns)
+                       if column not in self.positions]
+            if missing:
+                self.add(missing)
+            index = [self.positions[column] for column in columns]
+            return pd.DataFrame(self.matrix[np.ix_(index, index)],
+                                index=columns, columns=columns)
+
+    def get_vector(self, column: str) -> np.ndarray:
+        """Center a column (its ranks for Spearman) to unit length, a
+        constant column gives NaN like pandas does"""
+
+        if column not in self.df:
+            raise KeyError(f"{column} is not a numeric column")
+        series = self.df[column]
+        if self.method == "spearman":
+            series = series.rank(method="average")
+        values = series.to_numpy(dtype=np.float64)
+        values = values - values.mean()
+        norm = np.sqrt(values @ values)
+        return values / norm if norm > 0 else np.full(len(values), np.nan)
+
+    def add(self, columns: list) -> None:
+        """Extend the matrix with new columns, only their rows and columns
+        are computed"""
+
+        new = np.column_stack([self.get_vector(column) for column in columns])
+        cross = new.T @ self.vectors  # New against the known columns
+        own = np.clip(new.T @ new, -1.0, 1.0)
+        np.fill_diagonal(own, np.where(np.isnan(new).any(axis=0),
+                                       np.nan, 1.0))
+        size = len(self.columns)
+        matrix = np.empty((size + len(columns), size + len(columns)))
+        matrix[:size, :size] = self.matrix
+        matrix[size:, :size] = np.clip(cross, -1.0, 1.0)
+        matrix[:size, size:] = matrix[size:, :size].T
+        matrix[size:, size:] = own
+
+        self.matrix = matrix
+        self.vectors = np.column_stack([self.vectors, new])
+        for column in columns:
+            self.positions[column] = len(self.columns)
+            self.columns.append(column)
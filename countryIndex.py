@@ -0,0 +1,115 @@
+import json
+import os
+import unicodedata
+from importlib import metadata
+from typing import Optional
+import pandas as pd
+
+
+class CountryIndex:
+    """This class resolves country names to ISO alpha-3 codes"""
+
+    INDEX_VERSION: int = 1  # Bump whenever build or normalize changes
+
+    def __init__(self, alias_path: str = None, cache_path: str = None,
+                 aliases: dict = None):
+        # Set the attributes
+        data_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                "data")
+        self.alias_path: str = alias_path or os.path.join(
+            data_dir, "country_aliases.csv")  # User supplied aliases
+        self.cache_path: str = cache_path or os.path.join(
+            data_dir, ".cache", "country_index.json")  # Persisted index
+        self.aliases: dict = aliases or {}  # Extra in-memory aliases
+        self._index: Optional[dict] = None  # normalized name -> ISO
+        self._key: Optional[str] = None  # Key the index was built for
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """Normalize a name, ignoring accents, case, punctuation and 'the'"""
+
+        text = unicodedata.normalize("NFKD", str(name))
+        text = "".join(char if char.isalnum() else " " for char in text
+                       if not unicodedata.combining(char)).casefold()
+        return " ".join(word for word in text.split() if word != "the")
+
+    def get_key(self) -> str:
+        """Get the key the persisted index is valid for"""
+
+        try:
+            stat = os.stat(self.alias_path)
+            alias_key = f"{stat.st_size}|{stat.st_mtime_ns}"
+        except OSError:
+            alias_key = "-"
+        return f"{self.INDEX_VERSION}|{metadata.version('pycountry')}|" \
+               f"{alias_key}"
+
+    def get_index(self) -> dict:
+        """Get the name index, from disk when it is still valid"""
+
+        key = self.get_key()
+        if self._index is None or key != self._key:  # Aliases were edited
+            self._index = None
+            self._key = key
+            try:
+                with open(self.cache_path, encoding="utf-8") as f:
+                    cached = json.load(f)
+                if cached.get("key") == key:
+                    self._index = cached["index"]
+            except (OSError, ValueError, KeyError):
+                pass
+
+            if self._index is None:
+                self._index = self.build()
+                self.store(key)
+            self._index.update({self.normalize(name): iso
+                                for name, iso in self.aliases.items()})
+        return self._index
+
+    def build(self) -> dict:
+        """Build the index from pycountry and the alias file"""
+
+        import pycountry  # Only needed when the persisted index is stale
+
+        index = {}
+        # Historic names first so current names win on a clash
+        for countries in (pycountry.historic_countries, pycountry.countries):
+            for country in countries:
+                for attr in ("name", "official_name", "common_name"):
+                    name = getattr(country, attr, None)
+                    if not name:
+                        continue
+                    index[self.normalize(name)] = country.alpha_3
+                    if ", " in name:  # "Korea, Republic of" -> "Republic..."
+                        head, tail = name.split(", ", 1)
+                        index[self.normalize(f"{tail} {head}")] = \
+                            country.alpha_3
+
+        if os.path.exists(self.alias_path):
+            aliases = pd.read_csv(self.alias_path, dtype=str)
+            index.update({self.normalize(alias): iso for alias, iso in
+                          zip(aliases["Alias"], aliases["ISO"])})
+        return index
+
+    def store(self, key: str) -> None:
+        """Persist the index, a failure only costs a rebuild next time"""
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "index": self._index}, f)
+        except OSError:
+            pass
+
+    def resolve(self, names: pd.Series) -> tuple:
+        """Resolve a column of names, return (ISO series, unresolved names)"""
+
+        codes, uniques = pd.factorize(names)
+        index = self.get_index()
+        found = pd.Series([self.normalize(name) for name in uniques],
+                          dtype=object).map(index)
+        iso = pd.Series(found.to_numpy()[codes], index=names.index,
+                        name="ISO")
+        iso[codes < 0] = None
+        unresolved = [str(name) for name in uniques[found.isna().to_numpy()]]
+        return iso, unresolved
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Optional
+import numpy as np
+import pandas as pd
+
+
+class DatasetCache:
+    """This class persists prepared datasets as memory-mapped NumPy columns"""
+
+    def __init__(self, directory: str = None):
+        # Set the attributes
+        self.directory: Optional[str] = directory  # None = next to the source
+
+    def get_dir(self, path: str) -> str:
+        """Get the cache directory of a source file"""
+
+        if self.directory:
+            return self.directory
+        return os.path.join(os.path.dirname(os.path.realpath(path)), ".cache")
+
+    @staticmethod
+    def get_key(path: str, version: Any) -> str:
+        """Get the cache key of a source file and a prepare version (anything
+        else the prepared data depends on can be part of it)"""
+
+        stat = os.stat(path)
+        text = f"{os.path.realpath(path)}|{stat.st_size}|{stat.st_mtime_ns}" \
+               f"|{version}"
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def load(self, path: str, version: Any) -> Optional[pd.DataFrame]:
+        """Load a prepared dataset, None if it is missing or stale"""
+
+        entry = os.path.join(self.get_dir(path), self.get_key(path, version))
+        try:
+            with open(os.path.join(entry, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+
+            index = pd.Index(np.load(os.path.join(entry, "index.npy")))
+            columns = []
+            for i, column in enumerate(meta["columns"]):
+                values = np.load(os.path.join(entry, f"{i}.npy"),
+                                 mmap_mode="r")
+                if column["kind"] == "category":
+                    values = pd.Categorical.from_codes(values,
+                                                       column["categories"])
+                elif column["kind"] == "object":
+                    values = values.astype(object)
+                columns.append(pd.Series(values, index=index,
+                                         name=column["name"], copy=False))
+            # A DataFrame of a dict would consolidate the columns into
+            # blocks, copying them out of the memory maps
+            df = pd.concat(columns, axis=1, copy=False)
+            df.attrs.update(meta.get("attrs", {}))
+            return df
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def store(self, path: str, version: Any, df: pd.DataFrame) -> None:
+        """Store a prepared dataset and drop the stale ones of the source"""
+
+        directory = self.get_dir(path)
+        key = self.get_key(path, version)
+        temp = os.path.join(directory, f"{key}.tmp{os.getpid()}")
+        meta = {"source": os.path.realpath(path), "attrs": df.attrs,
+                "columns": []}
+        try:
+            self.clear(path)
+            os.makedirs(temp, exist_ok=True)
+            for i, name in enumerate(df.columns):
+                series = df[name]
+                column = {"name": name}
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    column["kind"] = "category"
+                    column["categories"] = series.cat.categories.tolist()
+                    values = series.cat.codes.to_numpy()
+                elif series.dtype == object:
+                    column["kind"] = "object"
+                    values = series.to_numpy().astype(str)
+                else:
+                    column["kind"] = "numeric"
+                    values = series.to_numpy()
+                np.save(os.path.join(temp, f"{i}.npy"), values)
+                meta["columns"].append(column)
+            np.save(os.path.join(temp, "index.npy"), df.index.to_numpy())
+            with open(os.path.join(temp, "meta.json"), "w",
+                      encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(temp, os.path.join(directory, key))
+        except OSError:  # A read-only data directory only loses the cache
+            shutil.rmtree(temp, ignore_errors=True)
+
+    def clear(self, path: str) -> None:
+        """Remove every cached entry of a source file"""
+
+        directory = self.get_dir(path)
+        if not os.path.isdir(directory):
+            return
+        source = os.path.realpath(path)
+        for name in os.listdir(directory):
+            meta_path = os.path.join(directory, name, "meta.json")
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    if json.load(f).get("source") != source:
+                        continue
+            except (OSError, ValueError):
+                continue
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
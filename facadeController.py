@@ -1,10 +1,12 @@
 import os
 from typing import Any
+import numpy as np
 import pandas as pd
 import seaborn as sns
 import networkx as nx
+from aggregationCube import AggregationCube
 from commonWidget import CommonWidget
-from model import Analysis
+from model import Analysis, layout_cache
 
 
 class FacadeController(CommonWidget):
@@ -12,22 +14,61 @@ class FacadeController(CommonWidget):
 
     def __init__(self):
         super().__init__()
-        self.model: Analysis = Analysis()  # Analysis model
+        self.model: Analysis = Analysis()  # Analysis model (shared dataset)
 
-    def get_statistic(self) -> dict:
+    def get_statistic(self) -> str:
         """Get the descriptive statistics"""
 
         return self.model.get_descriptive_statistics()
 
-    def get_df(self, event: str = "") -> pd.DataFrame:
+    def get_statistic_table(self, mask: Any = None) -> pd.DataFrame:
+        """Get the descriptive statistics table (of the masked rows)"""
+
+        return self.model.get_statistics(mask)
+
+    def get_df(self, event: str = "", rows: Any = None) -> pd.DataFrame:
         """Get the dataframe"""
 
+        return self.model.get_display_df(event, rows)
+
+    def get_row_positions(self, event: str = "") -> np.ndarray:
+        """Get the positions of the rows matching the query"""
+
         if event:
-            return self.model.df.query(event).applymap(
-                lambda x: float(f'{x:.2f}') if isinstance(x, float) else x)
+            return self.model.get_query_rows(event)
+        return np.arange(len(self.model.df))
+
+    def get_correlation(self, event: str = "", method: str = "pearson",
+                        columns: Any = None) -> pd.DataFrame:
+        """Get the correlation matrix of the rows matching the query"""
+
+        return self.model.get_correlation(event, method, columns)
+
+    def get_aggregation_cube(self) -> AggregationCube:
+        """Get the aggregations per human development group and ISO"""
+
+        return self.model.get_aggregation_cube()
+
+    def sort_rows(self, rows: np.ndarray, column: str,
+                  descending: bool = False) -> np.ndarray:
+        """Sort the row positions by a column"""
+
+        return self.model.get_sorted_rows(rows, column, descending)
 
-        return self.model.df.applymap(
-            lambda x: float(f'{x:.2f}') if isinstance(x, float) else x)
+    def get_version(self) -> int:
+        """Get the version of the dataset"""
+
+        return self.model.version
+
+    def get_data_key(self) -> str:
+        """Get the key of the dataset contents, the same in every run"""
+
+        return self.model.data_key
+
+    def reload_data(self) -> None:
+        """Reload the dataset from disk for the whole application"""
+
+        self.model.reload()
 
     def get_columns(self) -> list:
         """Get the columns"""
@@ -37,16 +78,32 @@ class FacadeController(CommonWidget):
     def get_rows(self) -> list:
         """Get the rows"""
 
-        return self.model.df.applymap(
-            lambda x: f'{x:.2f}' if isinstance(x, float)
-            else x).values.tolist()
+        return self.model.get_display_rows()
 
     def get_network_graph(self, col, color1: str, color2: str, color3: str,
-                          color4: str) -> nx.Graph:
-        """Get the network graph"""
+                          color4: str, sample_size: int = 15,
+                          seed: int = None) -> nx.Graph:
+        """Get the network graph, of every country if sample_size is None"""
 
         return self.model.get_network_graph(col, color1, color2, color3,
-                                            color4)
+                                            color4, sample_size, seed)
+
+    def get_similarity_graph(self, columns: tuple, k: int, color1: str,
+                             color2: str, color3: str,
+                             color4: str) -> nx.Graph:
+        """Get the k nearest neighbour graph of the countries"""
+
+        return self.model.get_similarity_graph(columns, k, color1, color2,
+                                               color3, color4)
+
+    def compute_layout(self, G: nx.Graph, name: str, seed: int = None,
+                       start: str = None) -> dict:
+        """Get the node positions of a layout, computing them if needed,
+        an iterative layout starts from the positions of the start layout"""
+
+        return layout_cache.compute(
+            G, name, self.get_network_func(name), seed,
+            (start, self.get_network_func(start)) if start else None)
 
     def regression(self, mode: str = "", option: dict = None,
                    value: dict = None) -> Any:
@@ -54,6 +111,30 @@ class FacadeController(CommonWidget):
 
         return self.model.regression(mode, option, value)
 
+    def regression_interval(self, mode: str = "", option: dict = None,
+                            value: dict = None) -> tuple:
+        """Get the prediction with its 95% confidence interval and CV RMSE"""
+
+        return self.model.regression_interval(mode, option, value)
+
+    def search_models(self, target: str = "GII", method: str = "subsets",
+                      max_size: int = 3) -> pd.DataFrame:
+        """Get the ranked table of models of the target"""
+
+        return self.model.search_models(target, method, max_size)
+
+    def predict_batch(self, mode: str = "", option: dict = None,
+                      data: Any = None) -> Any:
+        """Predict many rows, yields the predictions chunk by chunk"""
+
+        return self.model.predict_batch(mode, option, data)
+
+    def score_file(self, mode: str = "", option: dict = None,
+                   path: str = "") -> tuple:
+        """Score every row of a CSV file into a new CSV file"""
+
+        return self.model.score_csv(mode, option, path)
+
     @staticmethod
     def get_dir_path() -> str:
         """Get the directory path"""
@@ -107,6 +188,16 @@ class FacadeController(CommonWidget):
                "visualize.\n\n **The color in the program is just a " \
                "theme, it has no \nsignificant meaning at all."
 
+    def get_unresolved_text(self) -> str:
+        """Get the note about the countries without an ISO code, empty when
+        every country was matched"""
+
+        names = self.model.unresolved_countries
+        if not names:
+            return ""
+        return f"⚠ No ISO code for {', '.join(names)}, shown by name. " \
+               f"Add them to data/country_aliases.csv to match them."
+
     @staticmethod
     def get_warning_text() -> str:
         """Get the warning text"""
@@ -222,7 +313,7 @@ class FacadeController(CommonWidget):
     def get_corr_plot() -> list:
         """Get the correlation plot choices"""
 
-        return ["scatterplot", "lineplot"]
+        return ["scatterplot", "lineplot", "heatmap"]
 
     @staticmethod
     def get_plot_func(string: str) -> Any:
@@ -265,6 +356,34 @@ class FacadeController(CommonWidget):
                 "spiral",
                 "arf"]
 
+    @staticmethod
+    def get_similarity_plot() -> list:
+        """Get the layout choices of the similarity graph, a k-nearest
+        neighbour graph is never planar"""
+
+        return [layout for layout in FacadeController.get_network_plot()
+                if layout != "planar"]
+
+    @staticmethod
+    def get_network_samples() -> list:
+        """Get the number of countries choices of the network graph"""
+
+        return ["15", "30", "50", "100", "All"]
+
+    @staticmethod
+    def get_similarity_columns() -> dict:
+        """Get the indicator choices of the similarity graph"""
+
+        return {
+            "All indicators": ("GII", "Maternal_mortality",
+                               "Adolescent_birth_rate", "Seats_parliament",
+                               "F_secondary_educ", "M_secondary_educ",
+                               "F_Labour_force", "M_Labour_force"),
+            "Health": ("Maternal_mortality", "Adolescent_birth_rate"),
+            "Education": ("F_secondary_educ", "M_secondary_educ"),
+            "Labour force": ("F_Labour_force", "M_Labour_force"),
+        }
+
     @staticmethod
     def get_network_func(string: str) -> Any:
         """Get the network function"""
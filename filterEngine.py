@@ -0,0 +1,548 @@
+import re
+import threading
+from typing import Any
+import numpy as np
+import pandas as pd
+
+
+class FilterError(SyntaxError):
+    """Raised when a filter is invalid, offset is its 1-based position"""
+
+    def __init__(self, message: str, text: str = "", position: int = 0):
+        super().__init__(message, ("<filter>", 1, position + 1, text))
+        self.position: int = position  # 0-based position in the filter
+
+    def __str__(self) -> str:
+        return f"{self.msg} at position {self.position + 1}"
+
+
+class FilterIndex:
+    """This class lazily builds the per-column indexes filters run on"""
+
+    HASHED: tuple = ("Country", "ISO", "Human_development")
+
+    def __init__(self, df: pd.DataFrame):
+        # Set the attributes
+        self.df: pd.DataFrame = df  # Indexed dataset
+        self.size: int = len(df)  # Number of rows
+        self._sorted: dict = {}  # column -> (order, sorted values, valid)
+        self._hashed: dict = {}  # column -> {value: positions}
+        self._lock: threading.Lock = threading.Lock()
+
+    def has_column(self, column: str) -> bool:
+        """Check if the dataset has a column"""
+
+        return column in self.df.columns
+
+    def is_numeric(self, column: str) -> bool:
+        """Check if a column is numeric"""
+
+        return pd.api.types.is_numeric_dtype(self.df[column])
+
+    def is_hashed(self, column: str) -> bool:
+        """Check if a column is looked up by value rather than by range"""
+
+        return column in self.HASHED or not self.is_numeric(column)
+
+    def get_values(self, column: str) -> np.ndarray:
+        """Get the raw values of a column"""
+
+        return self.df[column].to_numpy()
+
+    def get_sorted(self, column: str) -> tuple:
+        """Get (argsort permutation, sorted values, non-NaN count)"""
+
+        with self._lock:
+            if column not in self._sorted:
+                values = self.get_values(column)
+                order = np.argsort(values, kind="stable")
+                ordered = values[order]
+                valid = len(ordered) - int(np.isnan(ordered).sum()) \
+                    if ordered.dtype.kind == "f" else len(ordered)
+                self._sorted[column] = (order, ordered, valid)
+            return self._sorted[column]
+
+    def get_hashed(self, column: str) -> dict:
+        """Get a value -> row positions map of a column"""
+
+        with self._lock:
+            if column not in self._hashed:
+                codes, uniques = pd.factorize(self.df[column])
+                order = np.argsort(codes, kind="stable")
+                counts = np.bincount(codes[codes >= 0],
+                                     minlength=len(uniques))
+                ends = np.cumsum(counts) + int((codes < 0).sum())
+                self._hashed[column] = {
+                    value: order[end - count:end]
+                    for value, count, end in zip(uniques, counts, ends)}
+            return self._hashed[column]
+
+    def to_mask(self, positions: np.ndarray) -> np.ndarray:
+        """Turn row positions into a boolean mask"""
+
+        mask = np.zeros(self.size, dtype=bool)
+        mask[positions] = True
+        return mask
+
+
+class Range:
+    """Column value between two (optional) bounds, `==` is a closed range"""
+
+    def __init__(self, column: str, position: int, low: Any = None,
+                 low_closed: bool = False, high: Any = None,
+                 high_closed: bool = False):
+        self.column: str = column
+        self.position: int = position
+        self.low: Any = low
+        self.low_closed: bool = low_closed
+        self.high: Any = high
+        self.high_closed: bool = high_closed
+
+    def __repr__(self) -> str:
+        if self.is_equal():
+            return f"({self.column} == {self.low!r})"
+        low = "" if self.low is None else \
+            f"{self.low!r} {'<=' if self.low_closed else '<'} "
+        high = "" if self.high is None else \
+            f" {'<=' if self.high_closed else '<'} {self.high!r}"
+        return f"({low}{self.column}{high})"
+
+    def is_equal(self) -> bool:
+        """Check if the range holds a single value"""
+
+        return self.low is not None and self.low == self.high \
+            and self.low_closed and self.high_closed
+
+    def intersect(self, other: "Range") -> None:
+        """Narrow this range with another range on the same column"""
+
+        if other.low is not None and (
+                self.low is None or other.low > self.low
+                or (other.low == self.low and not other.low_closed)):
+            self.low, self.low_closed = other.low, other.low_closed
+        if other.high is not None and (
+                self.high is None or other.high < self.high
+                or (other.high == self.high and not other.high_closed)):
+            self.high, self.high_closed = other.high, other.high_closed
+
+    def evaluate(self, index: FilterIndex) -> np.ndarray:
+        """Select the rows through binary searches on the sorted column"""
+
+        if index.is_hashed(self.column):
+            return self.evaluate_hashed(index)
+
+        order, ordered, valid = index.get_sorted(self.column)
+        low, high = 0, valid
+        if self.low is not None:
+            side = "left" if self.low_closed else "right"
+            low = np.searchsorted(ordered[:valid],
+                                  self.cast(ordered, self.low), side=side)
+        if self.high is not None:
+            side = "right" if self.high_closed else "left"
+            high = np.searchsorted(ordered[:valid],
+                                   self.cast(ordered, self.high), side=side)
+        return index.to_mask(order[low:max(low, high)])
+
+    def evaluate_hashed(self, index: FilterIndex) -> np.ndarray:
+        """Select the rows of a hashed column"""
+
+        if self.is_equal():
+            positions = index.get_hashed(self.column).get(self.low)
+            if positions is None:
+                return np.zeros(index.size, dtype=bool)
+            return index.to_mask(positions)
+
+        # Ordering comparisons on text columns have no index
+        values = index.get_values(self.column).astype(object)
+        mask = np.ones(index.size, dtype=bool)
+        try:
+            if self.low is not None:
+                mask &= values >= self.low if self.low_closed \
+                    else values > self.low
+            if self.high is not None:
+                mask &= values <= self.high if self.high_closed \
+                    else values < self.high
+        except TypeError:
+            raise FilterError(f"cannot compare {self.column} with that value",
+                              position=self.position) from None
+        return mask
+
+    @staticmethod
+    def cast(ordered: np.ndarray, value: Any) -> Any:
+        """Compare in the column precision like NumPy does for scalars"""
+
+        if ordered.dtype.kind == "f":
+            return ordered.dtype.type(value)
+        return value
+
+
+class Member:
+    """Column value in a list of literals"""
+
+    def __init__(self, column: str, position: int, values: list):
+        self.column: str = column
+        self.position: int = position
+        self.values: list = values
+
+    def __repr__(self) -> str:
+        return f"({self.column} in {self.values!r})"
+
+    def evaluate(self, index: FilterIndex) -> np.ndarray:
+        """Union the rows of every listed value"""
+
+        if not index.is_hashed(self.column):
+            mask = np.zeros(index.size, dtype=bool)
+            for value in self.values:
+                mask |= Range(self.column, self.position, value, True, value,
+                              True).evaluate(index)
+            return mask
+
+        hashed = index.get_hashed(self.column)
+        positions = [hashed[value] for value in self.values if value in hashed]
+        if not positions:
+            return np.zeros(index.size, dtype=bool)
+        return index.to_mask(np.concatenate(positions))
+
+
+class ColumnCompare:
+    """Comparison between two columns, evaluated element-wise"""
+
+    OPERATORS: dict = {"<": np.less, "<=": np.less_equal, ">": np.greater,
+                       ">=": np.greater_equal, "==": np.equal,
+                       "!=": np.not_equal}
+
+    def __init__(self, left: str, op: str, right: str, position: int):
+        self.left: str = left
+        self.op: str = op
+        self.right: str = right
+        self.position: int = position
+
+    def __repr__(self) -> str:
+        return f"({self.left} {self.op} {self.right})"
+
+    def evaluate(self, index: FilterIndex) -> np.ndarray:
+        """Compare the two columns"""
+
+        try:
+            return np.asarray(self.OPERATORS[self.op](
+                index.get_values(self.left), index.get_values(self.right)),
+                dtype=bool)
+        except TypeError:
+            raise FilterError(f"cannot compare {self.left} with "
+                              f"{self.right}", position=self.position) \
+                from None
+
+
+class Constant:
+    """Comparison between two literals"""
+
+    def __init__(self, value: bool):
+        self.value: bool = bool(value)
+
+    def __repr__(self) -> str:
+        return repr(self.value)
+
+    def evaluate(self, index: FilterIndex) -> np.ndarray:
+        """Select every row or none"""
+
+        return np.full(index.size, self.value)
+
+
+class Logical:
+    """`and` / `or` of several terms, or `not` of a single one"""
+
+    def __init__(self, op: str, terms: list):
+        self.op: str = op
+        self.terms: list = terms
+
+    def __repr__(self) -> str:
+        if self.op == "not":
+            return f"(not {self.terms[0]!r})"
+        return "(" + f" {self.op} ".join(map(repr, self.terms)) + ")"
+
+    def evaluate(self, index: FilterIndex) -> np.ndarray:
+        """Combine the masks of the terms"""
+
+        mask = self.terms[0].evaluate(index)
+        if self.op == "not":
+            return ~mask
+        for term in self.terms[1:]:
+            if self.op == "and":
+                mask &= term.evaluate(index)
+            else:
+                mask |= term.evaluate(index)
+        return mask
+
+
+class FilterParser:
+    """This class compiles a filter expression into a tree of conditions
+
+    The grammar is the subset of DataFrame.query the DataFrame tab uses:
+    comparisons (also chained, like `0.05 > GII > 0.01`), `in` / `not in`
+    lists, `and` / `or` / `not` (or `&` / `|` / `~`) and parentheses.
+    Nothing is ever evaluated as Python."""
+
+    TOKEN = re.compile(r"""\s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+        |(?P<string>'[^']*'|"[^"]*")
+        |(?P<name>[A-Za-z_]\w*|`[^`]+`)
+        |(?P<op>==|!=|<=|>=|<|>|\(|\)|\[|\]|,|&|\||~|-)
+        )""", re.VERBOSE)
+    COMPARE: tuple = ("==", "!=", "<", "<=", ">", ">=")
+    FLIP: dict = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==",
+                  "!=": "!="}
+
+    def __init__(self, text: str, index: FilterIndex):
+        # Set the attributes
+        self.text: str = text  # Filter expression
+        self.index: FilterIndex = index  # Used to validate the columns
+        self.tokens: list = self.tokenize(text)  # (kind, value, position)
+        self.pos: int = 0  # Current token
+
+    def tokenize(self, text: str) -> list:
+        """Split the expression into tokens"""
+
+        tokens, pos = [], 0
+        while pos < len(text):
+            match = self.TOKEN.match(text, pos)
+            if not match or match.end() == pos:
+                if not text[pos:].strip():
+                    break
+                pos += len(text[pos:]) - len(text[pos:].lstrip())
+                raise FilterError(f"unexpected character {text[pos]!r}",
+                                  text, pos)
+            kind = match.lastgroup
+            value = match.group(kind)
+            start = match.start(kind)
+            if kind == "name" and value in ("and", "or", "not", "in"):
+                kind = "op"
+            tokens.append((kind, value, start))
+            pos = match.end()
+        tokens.append(("end", "", len(text)))
+        return tokens
+
+    def error(self, message: str, token: tuple = None) -> FilterError:
+        """Build an error at a token (the current one by default)"""
+
+        token = token or self.tokens[self.pos]
+        return FilterError(message, self.text, token[2])
+
+    def peek(self) -> tuple:
+        """Get the current token"""
+
+        return self.tokens[self.pos]
+
+    def take(self, *values: str) -> Any:
+        """Consume the current token if it is one of the given operators"""
+
+        token = self.tokens[self.pos]
+        if token[0] == "op" and token[1] in values:
+            self.pos += 1
+            return token
+        return None
+
+    def expect(self, value: str) -> None:
+        """Consume an operator or fail"""
+
+        if not self.take(value):
+            raise self.error(f"expected {value!r}")
+
+    def parse(self) -> Any:
+        """Parse the whole expression"""
+
+        if self.peek()[0] == "end":
+            raise self.error("empty filter")
+        node = self.parse_or()
+        if self.peek()[0] != "end":
+            raise self.error(f"unexpected {self.peek()[1]!r}")
+        return node
+
+    def parse_or(self) -> Any:
+        """or_expr := and_expr (('or' | '|') and_expr)*"""
+
+        terms = [self.parse_and()]
+        while self.take("or", "|"):
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else Logical("or", terms)
+
+    def parse_and(self) -> Any:
+        """and_expr := not_expr (('and' | '&') not_expr)*"""
+
+        terms = [self.parse_not()]
+        while self.take("and", "&"):
+            terms.append(self.parse_not())
+        return terms[0] if len(terms) == 1 else Logical("and", terms)
+
+    def parse_not(self) -> Any:
+        """not_expr := ('not' | '~') not_expr | atom"""
+
+        if self.take("not", "~"):
+            return Logical("not", [self.parse_not()])
+        return self.parse_atom()
+
+    def parse_atom(self) -> Any:
+        """atom := '(' or_expr ')' | comparison"""
+
+        if self.take("("):
+            node = self.parse_or()
+            self.expect(")")
+            return node
+        return self.parse_comparison()
+
+    def parse_comparison(self) -> Any:
+        """comparison := operand (op operand)+ | operand ['not'] 'in' list"""
+
+        left = self.parse_operand()
+        if self.peek()[1] in ("in", "not") and self.peek()[0] == "op":
+            negate = bool(self.take("not"))
+            token = self.peek()
+            self.expect("in")
+            if left[0] != "column":
+                raise self.error("`in` needs a column on its left", token)
+            list_position = self.peek()[2]
+            node = self.build_member(left, self.parse_list(), list_position)
+            return Logical("not", [node]) if negate else node
+
+        terms = []
+        while self.peek()[0] == "op" and self.peek()[1] in self.COMPARE:
+            op = self.take(*self.COMPARE)
+            right = self.parse_operand(allow_list=op[1] in ("==", "!="))
+            terms.append(self.build_compare(left, op, right))
+            left = right
+        if not terms:
+            raise self.error("expected a comparison")
+        if len(terms) == 1:
+            return terms[0]
+        return self.merge_ranges(terms)
+
+    def parse_operand(self, allow_list: bool = False) -> tuple:
+        """operand := column | number | string | '-' number | list"""
+
+        kind, value, position = self.peek()
+        if allow_list and kind == "op" and value == "[":
+            return "list", self.parse_list(), position
+        if kind == "op" and value == "-":
+            self.pos += 1
+            kind, value, _ = self.peek()
+            if kind != "number":
+                raise self.error("expected a number")
+            self.pos += 1
+            return "literal", -self.to_number(value), position
+
+        self.pos += 1
+        if kind == "number":
+            return "literal", self.to_number(value), position
+        if kind == "string":
+            return "literal", value[1:-1], position
+        if kind == "name":
+            column = value.strip("`")
+            if not self.index.has_column(column):
+                raise FilterError(f"unknown column {column!r}", self.text,
+                                  position)
+            return "column", column, position
+        self.pos -= 1
+        if kind == "end":
+            raise self.error("unexpected end of filter")
+        raise self.error(f"unexpected {value!r}")
+
+    def parse_list(self) -> list:
+        """list := '[' literal (',' literal)* ']' """
+
+        self.expect("[")
+        values = []
+        while not self.take("]"):
+            if values:
+                self.expect(",")
+                if self.take("]"):
+                    break
+            kind, value, _ = self.parse_operand()
+            if kind != "literal":
+                raise self.error("lists can only hold literals",
+                                 self.tokens[self.pos - 1])
+            values.append(value)
+        return values
+
+    @staticmethod
+    def to_number(text: str) -> Any:
+        """Convert a number literal"""
+
+        number = float(text)
+        return int(number) if number.is_integer() and \
+            re.fullmatch(r"\d+", text) else number
+
+    def build_member(self, column: tuple, values: list,
+                     position: int) -> Member:
+        """Build the node of a column in a list, a numeric column only takes
+        numbers"""
+
+        if self.index.is_numeric(column[1]):
+            for value in values:
+                if isinstance(value, str):
+                    raise FilterError(f"{column[1]} is numeric, {value!r} is "
+                                      f"not", self.text, position)
+        return Member(column[1], column[2], values)
+
+    def build_compare(self, left: tuple, op: tuple, right: tuple) -> Any:
+        """Build the node of a single comparison"""
+
+        if left[0] == "list":
+            left, right, op = right, left, (op[0], self.FLIP[op[1]], op[2])
+        if right[0] == "list" or left[0] == "list":
+            if left[0] != "column":
+                raise self.error("a list needs a column to compare with", op)
+            node = self.build_member(left, right[1], right[2])
+            return Logical("not", [node]) if op[1] == "!=" else node
+
+        if left[0] == "column" and right[0] == "column":
+            return ColumnCompare(left[1], op[1], right[1], op[2])
+        if left[0] == "literal" and right[0] == "literal":
+            try:
+                return Constant(ColumnCompare.OPERATORS[op[1]](left[1],
+                                                                right[1]))
+            except TypeError:
+                raise self.error("cannot compare these values", op) from None
+
+        operator = op[1]
+        if left[0] == "literal":  # Keep the column on the left
+            left, right, operator = right, left, self.FLIP[operator]
+        column, value = left[1], right[1]
+        if self.index.is_numeric(column) and isinstance(value, str):
+            raise FilterError(f"{column} is numeric, {value!r} is not",
+                              self.text, right[2])
+
+        position = left[2]
+        if operator == "==":
+            return Range(column, position, value, True, value, True)
+        if operator == "!=":
+            return Logical("not", [Range(column, position, value, True, value,
+                                         True)])
+        if operator in ("<", "<="):
+            return Range(column, position, high=value,
+                         high_closed=operator == "<=")
+        return Range(column, position, low=value, low_closed=operator == ">=")
+
+    @staticmethod
+    def merge_ranges(terms: list) -> Any:
+        """AND the terms of a chain, merging ranges on the same column"""
+
+        merged, ranges = [], {}
+        for term in terms:
+            if isinstance(term, Range) and not term.is_equal():
+                if term.column in ranges:
+                    ranges[term.column].intersect(term)
+                    continue
+                ranges[term.column] = term
+            merged.append(term)
+        return merged[0] if len(merged) == 1 else Logical("and", merged)
+
+
+def compile_filter(text: str, index: FilterIndex) -> Any:
+    """Compile a filter expression against the columns of an index"""
+
+    return FilterParser(text, index).parse()
+
+
+def run_filter(text: str, index: FilterIndex) -> np.ndarray:
+    """Get the positions of the rows matching a filter expression"""
+
+    return np.flatnonzero(compile_filter(text, index).evaluate(index))
@@ -0,0 +1,284 @@
+from typing import Any
+import networkx as nx
+import seaborn as sns
+from matplotlib.figure import Figure
+from facadeController import FacadeController
+
+COLOR_OPTIONS: tuple = ("Color1", "Color2", "Color3", "Color4")
+
+
+class GraphPlotter:
+    """This class turns graph options into the stages of a plot
+
+    get_graph gives the prepare stage, the draw stage, the plot spec and
+    the palette of a graph, they run on the RenderPipeline worker in the
+    Plot tab and in a worker process in batchRender. Nothing here touches
+    Tk."""
+
+    def __init__(self, facade: FacadeController):
+        # Set the attributes
+        self.facade: FacadeController = facade
+        self.df: Any = facade.get_df()  # Rows the plots are drawn from
+        self.graphs: dict = {  # Graph option -> stages of that graph
+            "Distribution": self.get_dis_graph,
+            "Everyday": self.get_everyday_graph,
+            "Correlation": self.get_corr_graph,
+            "Network": self.get_network_graph,
+            "Similarity": self.get_similarity_graph,
+        }
+
+    def get_graph(self, graph: str, options: dict,
+                  data_key: str = None) -> tuple:
+        """Get the prepare stage, draw stage, spec, palette and redraw of a
+        graph, the dataset key (of the facade by default) is added to the
+        spec
+
+        The palette is None when the colours change more of the plot than
+        the colours of its artists (a colour map, colours seaborn derives
+        from them), the colours are part of the spec then. redraw draws the
+        graph on a figure in another palette."""
+
+        if graph not in self.graphs:
+            raise ValueError(f"Unknown graph {graph}, use "
+                             f"{', '.join(self.graphs)}")
+        prepare, draw, spec, recolor = self.graphs[graph](dict(options))
+        colors = tuple(self.get_colors(options))
+        data_key = data_key or self.facade.get_data_key()
+
+        def redraw(figure: Figure, palette: tuple) -> None:
+            other = dict(options, **dict(zip(COLOR_OPTIONS, palette)))
+            prepare_other, draw_other, *_ = self.graphs[graph](other)
+            draw_other(figure, prepare_other())
+
+        if recolor:
+            return prepare, draw, (*spec, data_key), colors, redraw
+        return prepare, draw, (*spec, *colors, data_key), None, redraw
+
+    @staticmethod
+    def get_colors(options: dict) -> list:
+        """This method is responsible for getting the colors."""
+
+        color1 = options.get("Color1", "#39B5E0")
+        color2 = options.get("Color2", "#FB2576")
+        color3 = options.get("Color3", "#C9F4AA")
+        color4 = options.get("Color4", "#F5EA5A")
+        return [color1, color2, color3, color4]
+
+    def get_dis_graph(self, options: dict) -> tuple:
+        """Get the stages of the distribution graph"""
+
+        plot = options.get("Plot", "histplot")
+        return (lambda: options, self.draw_dis_graph,
+                ("dis", plot, options.get("Column", "GII")),
+                plot != "boxplot")  # Its greys depend on the palette
+
+    def draw_dis_graph(self, figure: Figure, options: dict) -> None:
+        """Draw the distribution graph, on the render worker"""
+
+        sns.set_style("darkgrid")
+        ax = figure.add_subplot()
+        colors = self.get_colors(options)
+        if options.get("Plot", "histplot") != "boxplot":
+            plot = self.facade.get_plot_func(
+                options.get("Plot", "histplot"))(
+                data=self.df,
+                x=self.df[options.get("Column", "GII")],
+                hue='Human_development',
+                palette=colors,
+                ax=ax,
+            )
+        else:
+            plot = self.facade.get_plot_func(
+                options.get("Plot", "histplot"))(
+                data=self.df,
+                y=self.df[options.get("Column", "GII")],
+                hue='Human_development',
+                palette=colors,
+                ax=ax,
+            )
+        plot.set(
+            title=f"A graph show the frequency of {options.get('Column', 'GII').replace('_', ' ')}")
+        plot.set_xlabel(options.get('Column', 'GII'))
+        plot.set_ylabel("Frequency")
+
+    def get_everyday_graph(self, options: dict) -> tuple:
+        """Get the stages of the everyday graph"""
+
+        stackbar = options.get("Plot") == "stackbar"
+        return (lambda: self.prepare_everyday_graph(options),
+                self.draw_everyday_graph,
+                ("everyday", stackbar, options.get("Column", "GII")),
+                not stackbar)  # The bars do not use the palette
+
+    def prepare_everyday_graph(self, options: dict) -> tuple:
+        """Read the everyday graph data from the aggregation cube, on the
+        render worker"""
+
+        column = options.get("Column", "GII")
+        cube = self.facade.get_aggregation_cube()
+        if options.get("Plot") == "stackbar":
+            # Select the 10 countries with the highest average value
+            # (In case that there are duplicated country)
+            top_10_cols = cube.top_k(cube.get_column_totals(column, "mean"),
+                                     10)
+
+            # Sum per human development of only the top 10 countries
+            return options, cube.get_table(column, "sum")[top_10_cols]
+
+        sums = cube.get_index_totals(column, "sum")
+        return options, (sums, sums.index.tolist())
+
+    def draw_everyday_graph(self, figure: Figure, data: tuple) -> None:
+        """Draw the everyday graph, on the render worker"""
+
+        options, table = data
+        sns.set_style("darkgrid")
+        ax = figure.add_subplot()
+        colors = self.get_colors(options)
+
+        if options.get("Plot") == "stackbar":  # Plot the stacked bar plot
+            table.plot(kind="bar", stacked=True, ax=ax)
+
+            # Set the title and labels
+            ax.set_title(
+                f"A graph showing proportion of {options.get('Column', 'GII')} of Top 10 Human Development by ISO")
+            ax.set_xlabel("Human Development")
+            ax.set_ylabel("Proportion")
+            ax.legend(loc='best')
+
+        else:  # Plot the pie chart
+            sums, labels = table
+            ax.pie(sums,
+                   labels=labels,
+                   autopct='%1.1f%%',
+                   startangle=90,
+                   colors=colors)
+            ax.axis('equal')
+            ax.set_title(f'A graph show proportion of {options.get("Column", "GII")} of Human Development')
+
+    def get_corr_graph(self, options: dict) -> tuple:
+        """Get the stages of the correlation graph, the heatmap is drawn
+        from the rows matching the Query option"""
+
+        colors = self.get_colors(options)
+        if options.get("Plot") == "heatmap":
+            query = options.get("Query", "")
+            method = options.get("Method", "Pearson")
+            return (lambda: (method, query, self.facade.get_correlation(
+                query, method.lower()), colors), self.draw_corr_heatmap,
+                    ("heatmap", method, query), False)  # A colour map
+
+        return (lambda: options, self.draw_corr_graph,
+                ("corr", options.get("Plot", "scatterplot"),
+                 options.get("Column1", "GII"),
+                 options.get("Column2", "Rank")), True)
+
+    def draw_corr_graph(self, figure: Figure, options: dict) -> None:
+        """Draw the correlation graph, on the render worker"""
+
+        sns.set_style("darkgrid")
+        ax = figure.add_subplot()
+        colors = self.get_colors(options)
+        plot = self.facade.get_plot_func(options.get("Plot",
+                                                     "scatterplot")) \
+            (self.df, x=options.get("Column1", "GII"),
+             y=options.get("Column2", "Rank"),
+             hue="Human_development",
+             palette=colors, ax=ax)
+
+        plot.set(title=f"A graph show the correlation of {options.get('Column1', 'GII')} and {options.get('Column2', 'Rank')}".replace('_', ' '))
+        plot.set_xlabel(options.get('Column1', 'GII'))
+        plot.set_ylabel(options.get('Column2', 'Rank'))
+
+    @staticmethod
+    def draw_corr_heatmap(figure: Figure, data: tuple) -> None:
+        """Draw the correlation matrix of the rows the DataFrame tab shows,
+        on the render worker"""
+
+        method, query, corr, colors = data
+        ax = figure.add_subplot()
+        plot = sns.heatmap(corr, vmin=-1, vmax=1, square=True,
+                           cmap=sns.blend_palette([colors[0], "white",
+                                                   colors[1]], as_cmap=True),
+                           annot=len(corr) <= 12, fmt=".2f",
+                           annot_kws={"size": 7}, ax=ax)
+        rows = "all rows" if not query else query
+        plot.set(title=f"{method} correlation ({rows})")
+        figure.tight_layout()
+
+    def get_network_graph(self, options: dict) -> tuple:
+        """Get the stages of the network graph, the graph is built and laid
+        out (or its positions taken from the layout cache) on the render
+        worker"""
+
+        layout = options.get("NPlot", "circular")
+        col = options.get("Column1", "GII")
+        colors = self.get_colors(options)
+        sample = options.get("Sample", "15")
+        size = None if sample == "All" else int(sample)
+        seed = options.get("Seed", 0)
+
+        def prepare() -> tuple:
+            G2 = self.facade.get_network_graph(col, colors[0], colors[1],
+                                               colors[2], colors[3], size,
+                                               seed)
+            return G2, self.facade.compute_layout(G2, layout, seed), col, size
+
+        return prepare, self.draw_network_graph, \
+            ("network", layout, col, size, seed), True
+
+    @staticmethod
+    def draw_network_graph(figure: Figure, data: tuple) -> None:
+        """Draw the network graph at its node positions, on the render
+        worker"""
+
+        G2, pos2, col, size = data
+        ax = figure.add_subplot()
+        node_colors_list = [G2.nodes[n].get('color', 'black') for n in G2.nodes()]
+        edge_width_list = [G2.edges[n]['weight'] / 50 for n in G2.edges()]
+        edge_labels = nx.get_edge_attributes(G2, "weight")
+
+        nx.draw_networkx_nodes(G2, pos2, node_size=400,
+                               node_color=node_colors_list, ax=ax)
+        nx.draw_networkx_edges(G2, pos2, width=edge_width_list, ax=ax)
+        nx.draw_networkx_labels(G2, pos2, font_size=15, ax=ax)
+        if G2.number_of_edges() <= 50:  # More labels only overlap
+            nx.draw_networkx_edge_labels(G2, pos2, edge_labels, ax=ax)
+        countries = "all" if size is None else size
+        ax.set_title(f"Random {col} and Human Development relation of "
+                     f"{countries} countries")
+
+    def get_similarity_graph(self, options: dict) -> tuple:
+        """Get the stages of the similarity graph"""
+
+        layout = options.get("NPlot", "spring")
+        indicators = options.get("Indicators", "All indicators")
+        k = int(options.get("Neighbours", "5"))
+        colors = self.get_colors(options)
+        seed = options.get("Seed", 0)
+
+        def prepare() -> tuple:
+            G = self.facade.get_similarity_graph(
+                self.facade.get_similarity_columns()[indicators], k,
+                colors[0], colors[1], colors[2], colors[3])
+            return G, self.facade.compute_layout(G, layout, seed), \
+                indicators, k
+
+        return prepare, self.draw_similarity_graph, \
+            ("similarity", layout, indicators, k, seed), True
+
+    @staticmethod
+    def draw_similarity_graph(figure: Figure, data: tuple) -> None:
+        """Draw the similarity graph at its node positions, on the render
+        worker"""
+
+        G, pos, indicators, k = data
+        ax = figure.add_subplot()
+        nx.draw_networkx_nodes(G, pos, node_size=60,
+                               node_color=[G.nodes[n].get('color', 'black')
+                                           for n in G.nodes()], ax=ax)
+        nx.draw_networkx_edges(G, pos, width=0.5, alpha=0.5, ax=ax)
+        if G.number_of_nodes() <= 200:  # More labels only overlap
+            nx.draw_networkx_labels(G, pos, font_size=6, ax=ax)
+        ax.set_title(f"Countries linked to their {k} most similar ones "
+                     f"({indicators.lower()})")
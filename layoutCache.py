@@ -0,0 +1,80 @@
+import hashlib
+import inspect
+from typing import Callable, Optional
+import networkx as nx
+from lruCache import LRUCache
+
+LAYOUT_CACHE_SIZE: int = 32  # Node positions kept, one entry per layout
+WARM_LAYOUTS: tuple = ("spring", "fruchterman", "arf")  # Take a start pos
+
+
+class LayoutCache:
+    """This class keeps the node positions of network layouts
+
+    Positions are keyed by a fingerprint of the graph structure (nodes in
+    order and weighted edges, not the colours), the layout name, the seed
+    and the layout they were warm-started from, so recolouring or
+    re-plotting the same graph skips the layout. An iterative layout can
+    start from the positions of another layout of the same graph and seed
+    instead of from random ones; that start is computed (or taken from the
+    cache) first, so the positions only depend on their key."""
+
+    def __init__(self, size: int = LAYOUT_CACHE_SIZE):
+        # Set the attributes
+        self._positions: LRUCache = LRUCache(size, sizeof=lambda pos: 1)
+
+    @staticmethod
+    def get_fingerprint(G: nx.Graph) -> str:
+        """Hash the nodes (in order) and the weighted edges of a graph"""
+
+        digest = hashlib.sha1(repr(list(G.nodes)).encode())
+        digest.update(repr([(u, v, data.get("weight")) for u, v, data
+                            in G.edges(data=True)]).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def get_start(name: str, func: Callable,
+                  start: tuple = None) -> Optional[tuple]:
+        """Get the (name, func) of the layout a layout starts from, None if
+        it cannot start from positions"""
+
+        if start is None or name not in WARM_LAYOUTS \
+                or "pos" not in inspect.signature(func).parameters:
+            return None
+        return start
+
+    def get(self, G: nx.Graph, name: str, seed: int = None,
+            start: str = None) -> Optional[dict]:
+        """Get the cached positions of a layout, None if not computed"""
+
+        return self._positions.get((self.get_fingerprint(G), name, seed,
+                                    start))
+
+    def compute(self, G: nx.Graph, name: str, func: Callable,
+                seed: int = None, start: tuple = None) -> dict:
+        """Get the positions of a layout, computing and caching them if
+        needed, safe to call from a worker thread
+
+        start is the (name, func) of a layout of the same graph and seed to
+        warm-start from, it is ignored by layouts that take no positions."""
+
+        start = self.get_start(name, func, start)
+        key = (self.get_fingerprint(G), name, seed,
+               start[0] if start else None)
+        pos = self._positions.get(key)
+        if pos is not None:
+            return pos
+
+        params = inspect.signature(func).parameters
+        kwargs: dict = {"seed": seed} if "seed" in params else {}
+        if start:
+            kwargs["pos"] = self.compute(G, *start, seed)
+        pos = func(G, **kwargs)
+
+        self._positions.put(key, pos)
+        return pos
+
+    def clear(self) -> None:
+        """Forget every cached position"""
+
+        self._positions.clear()
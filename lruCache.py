@@ -0,0 +1,52 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class LRUCache:
+    """This class is a thread-safe LRU cache bounded by a size budget"""
+
+    def __init__(self, budget: int, sizeof: Callable = sys.getsizeof):
+        # Set the attributes
+        self.budget: int = budget  # Maximum total size of the entries
+        self.sizeof: Callable = sizeof  # Size of one value
+        self.size: int = 0  # Current total size of the entries
+        self._entries: OrderedDict = OrderedDict()  # key -> (value, size)
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._entries
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Get a value and mark it as the most recently used"""
+
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key: Any, value: Any) -> None:
+        """Store a value, evicting the least recently used ones if needed"""
+
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            if size > self.budget:  # It would evict everything else
+                return
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.budget:
+                self.size -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self) -> None:
+        """Remove every entry"""
+
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
@@ -1,38 +1,246 @@
 import os
+import threading
+import warnings
 import networkx as nx
 import numpy as np
 import pandas as pd
-import pycountry
-from typing import Any
-from sklearn.linear_model import LinearRegression
+from typing import Any, Iterator
+from aggregationCube import AggregationCube
+from correlationMatrix import CorrelationMatrix
+from countryIndex import CountryIndex
+from datasetCache import DatasetCache
+from filterEngine import FilterIndex, compile_filter
+from layoutCache import LayoutCache
+from lruCache import LRUCache
+from regressionEngine import FoldMoments, GramMatrix, LinearFit, \
+    ModelUncertainty, bootstrap, search_stepwise, search_subsets
+
+
+DATA_PATH: str = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                              "data", "Gender_Inequality_Index.csv")
+PREPARE_VERSION: int = 2  # Bump whenever prepare_data changes its output
+QUERY_CACHE_BYTES: int = 64 * 2 ** 20  # Budget of the cached query results
+MODEL_CACHE_SIZE: int = 64  # Fitted models kept per dataset version
+CORRELATION_CACHE_SIZE: int = 16  # Correlation matrices kept per version
+CV_FOLDS: int = 5  # Folds of the cross-validated model scores
+CV_SEED: int = 0  # Seed of the fold split, keeps the scores reproducible
+BOOTSTRAP_SAMPLES: int = 1000  # Resamples behind the confidence intervals
+NETWORK_SAMPLE_SIZE: int = 15  # Countries drawn in the network graph
+SIMILARITY_NEIGHBOURS: int = 5  # Edges per country of the similarity graph
+PREDICT_CHUNK_ROWS: int = 100_000  # Rows scored per batch prediction chunk
+REGRESSION_INPUTS: dict = {  # Regression mode -> input fields it uses
+    "Simple Linear Regression": ("input1",),
+    "Multiple Linear Regression": ("input1", "input2", "input3"),
+}
+
+
+class DatasetRegistry:
+    """This class loads and prepares each dataset once per process"""
+
+    def __init__(self, cache: DatasetCache = None):
+        # Set the attributes
+        self._lock: threading.RLock = threading.RLock()
+        self._frames: dict = {}  # path -> (version, frame, derived results)
+        self._origs: dict = {}  # path -> raw frame
+        self._counter: int = 0  # Last handed out dataset version
+        self.cache: DatasetCache = cache or DatasetCache()  # Disk cache
+
+    def snapshot(self, path: str = DATA_PATH) -> tuple:
+        """Get the (version, read-only view, derived results) of a dataset
+
+        The derived results dict is shared by every user of this version and
+        is thrown away on reload, so anything computed from the dataset can
+        be memoized in it without further invalidation."""
+
+        with self._lock:
+            if path not in self._frames:
+                self._load(path)
+            version, frame, derived = self._frames[path]
+        # A shallow copy keeps the data shared but protects the registry
+        # frame from column assignment, renames and drops by callers, its
+        # arrays are read-only so in-place writes raise instead
+        return version, frame.copy(deep=False), derived
+
+    def get(self, path: str = DATA_PATH) -> pd.DataFrame:
+        """Get a read-only view of a prepared dataset"""
+
+        return self.snapshot(path)[1]
+
+    def get_original(self, path: str = DATA_PATH) -> pd.DataFrame:
+        """Get a read-only view of the raw dataset"""
+
+        with self._lock:
+            if path not in self._origs:
+                self._origs[path] = self.freeze(pd.read_csv(path))
+            return self._origs[path].copy(deep=False)
+
+    def version(self, path: str = DATA_PATH) -> int:
+        """Get the current version of a dataset"""
+
+        with self._lock:
+            if path not in self._frames:
+                self._load(path)
+            return self._frames[path][0]
+
+    def invalidate(self, path: str = None) -> None:
+        """Forget a dataset (or all of them) so the next access reloads it"""
+
+        with self._lock:
+            if path is None:
+                self._frames.clear()
+                self._origs.clear()
+            else:
+                self._frames.pop(path, None)
+                self._origs.pop(path, None)
+
+    def reload(self, path: str = DATA_PATH) -> int:
+        """Reload a dataset from disk and return its new version"""
+
+        with self._lock:
+            self.invalidate(path)
+            return self.version(path)
+
+    @staticmethod
+    def freeze(df: pd.DataFrame) -> pd.DataFrame:
+        """Get a frame of read-only copies of the columns, read-only ones
+        (memory maps) are kept as they are
+
+        The columns are not consolidated into blocks, consolidation would
+        copy them into writable arrays again."""
+
+        columns = []
+        for name in df.columns:
+            series = df[name]
+            categorical = isinstance(series.dtype, pd.CategoricalDtype)
+            values = series.array.codes if categorical else series.to_numpy()
+            owner = values
+            while isinstance(owner.base, np.ndarray):  # The array viewed
+                owner = owner.base
+            if owner.flags.writeable:
+                values = values.copy()
+                values.flags.writeable = False
+            if categorical:
+                values = pd.Categorical.from_codes(values, dtype=series.dtype)
+            columns.append(pd.Series(values, index=df.index, name=name,
+                                     copy=False))
+        frozen = pd.concat(columns, axis=1, copy=False)
+        frozen.attrs.update(df.attrs)
+        return frozen
+
+    def _load(self, path: str) -> None:
+        """Read and prepare a dataset, must be called with the lock held"""
+
+        # The ISO column depends on the country index (aliases) as well
+        version = f"{PREPARE_VERSION}|{country_index.get_key()}"
+        key = self.cache.get_key(path, version)
+        df = self.cache.load(path, version)
+        if df is None:
+            df = Analysis.prepare_data(pd.read_csv(path))
+            self.cache.store(path, version, df)
+        self._counter += 1
+        # The data key names the file contents, it is stable across runs
+        self._frames[path] = (self._counter, self.freeze(df),
+                              {"data_key": key})
+
+
+registry: DatasetRegistry = DatasetRegistry()  # Shared by the whole process
+country_index: CountryIndex = CountryIndex()  # Country name -> ISO lookup
+layout_cache: LayoutCache = LayoutCache()  # Network node positions
+
+
+def round_values(values: Any, decimals: int = 2) -> np.ndarray:
+    """Round an array exactly like float(f'{x:.2f}') without strings"""
+
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 10.0 ** decimals
+    result = np.round(scaled) / 10.0 ** decimals
+
+    # Only cells that land within an ulp of a .5 tie can disagree with the
+    # correctly rounded string conversion, so only those go through round()
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) <= np.spacing(np.abs(scaled))
+    for i in np.flatnonzero(ties):
+        result.flat[i] = round(float(values.flat[i]), decimals)
+    return result
 
 
 class Analysis:
     """This class is used to analyze the data and to perform the regression"""
 
-    def __init__(self):
+    def __init__(self, csv_path: str = DATA_PATH):
         # Set the attributes
-        self.csv_path: str = os.path.join(
-            os.path.dirname(os.path.realpath(__file__)), "data",
-            "Gender_Inequality_Index.csv")
-        self.orig_df: pd = pd.read_csv(self.csv_path)
-        self.df: Any = self.orig_df.copy()
-        self.model: LinearRegression = LinearRegression()
+        self.csv_path: str = csv_path
+        self._version: int = 0  # Version of the cached view
+        self._df: Any = None  # Cached view of the shared dataset
+        self._derived: dict = {}  # Results memoized for this version
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """Prepared dataset shared through the registry"""
+
+        self.refresh()
+        return self._df
+
+    @property
+    def orig_df(self) -> pd.DataFrame:
+        """Raw dataset shared through the registry"""
+
+        return registry.get_original(self.csv_path)
+
+    @property
+    def version(self) -> int:
+        """Version of the dataset, changes every time it is reloaded"""
+
+        self.refresh()
+        return self._version
+
+    @property
+    def data_key(self) -> str:
+        """Key of the source file contents and the prepare version, unlike
+        the version it is the same in every run"""
+
+        self.refresh()
+        return self._derived["data_key"]
+
+    def refresh(self) -> None:
+        """Pick up the current dataset if it has been reloaded"""
+
+        if registry.version(self.csv_path) != self._version:
+            self._version, self._df, self._derived = registry.snapshot(
+                self.csv_path)
 
-        # Initialize the data
-        self.prepare_data()
+    def reload(self) -> None:
+        """Reload the dataset from disk for every user in the process"""
 
-    def prepare_data(self) -> None:
+        registry.reload(self.csv_path)
+        self.refresh()
+
+    def memoize(self, key: Any, func: Any) -> Any:
+        """Compute func() once per dataset version and share the result"""
+
+        self.refresh()
+        derived = self._derived
+        if key not in derived:
+            # Two threads may both compute it, the first result stored wins
+            # and both return it
+            return derived.setdefault(key, func())
+        return derived[key]
+
+    @staticmethod
+    def prepare_data(df: pd.DataFrame) -> pd.DataFrame:
         """Prepare the data for the analysis"""
 
-        all_country = self.df['Country']
-        countries = {country.name: country.alpha_3 for country in
-                     pycountry.countries}
-        self.df['ISO'] = [countries.get(country) for country in all_country]
-        self.df = self.df.dropna()
-        self.df = self.df.applymap(
-            lambda x: f'{x:.2f}' if isinstance(x, float) else x)
-        self.df = self.df.astype({
+        iso, unresolved = country_index.resolve(df['Country'])
+        if unresolved:
+            warnings.warn("Countries without an ISO code keep their name as "
+                          "ISO, add the names to data/country_aliases.csv: "
+                          + ", ".join(unresolved))
+        df = df.dropna()
+        # Unresolved countries keep their rows, their name stands in for ISO
+        df['ISO'] = iso.fillna(df['Country'])
+        df.attrs["unresolved_countries"] = unresolved
+        df = df.assign(**{column: round_values(df[column])
+                          for column in df.select_dtypes("float").columns})
+        return df.astype({
             "Human_development": "category",
             "GII": "float32",
             "Rank": "float32",
@@ -45,69 +253,396 @@ class Analysis:
             "M_Labour_force": "float32",
         })
 
+    @property
+    def unresolved_countries(self) -> list:
+        """Country names that could not be matched to an ISO code"""
+
+        return self.df.attrs.get("unresolved_countries", [])
+
+    def get_display_df(self, query: str = "",
+                       rows: Any = None) -> pd.DataFrame:
+        """Get the (filtered) dataset rounded to 2 decimals for display,
+        rows only keeps the rows at those positions of the result"""
+
+        df = self.df.iloc[self.get_query_rows(query)] if query else self.df
+        if rows is not None:
+            df = df.iloc[rows]
+        return df.assign(
+            **{column: df[column].astype(object)
+               for column in df.select_dtypes("category").columns},
+            **{column: round_values(df[column])
+               for column in df.select_dtypes("float").columns})
+
+    def get_query_rows(self, query: str) -> np.ndarray:
+        """Get the positions of the rows matching a filter expression
+
+        The filter is compiled and run on the column indexes of this dataset
+        version. The positions (not the rows) are kept in an LRU cache keyed
+        by the compiled filter, so repeating or toggling a filter is a
+        dictionary lookup. Raises FilterError for an invalid filter."""
+
+        index = self.get_filter_index()
+        cache = self.memoize("queries", lambda: LRUCache(
+            QUERY_CACHE_BYTES, sizeof=lambda rows: rows.nbytes + 100))
+        node = compile_filter(query, index)
+        key = repr(node)
+        rows = cache.get(key)
+        if rows is None:
+            rows = np.flatnonzero(node.evaluate(index))
+            rows = rows.astype(np.int32 if index.size < 2 ** 31 else np.int64)
+            cache.put(key, rows)
+        return rows
+
+    def get_correlation(self, query: str = "", method: str = "pearson",
+                        columns: Any = None) -> pd.DataFrame:
+        """Get the correlations of the numeric columns of the rows matching
+        a filter (every row when it is empty)
+
+        One CorrelationMatrix is kept per (filter, method) in an LRU cache
+        of this dataset version, it only computes the columns it has not
+        seen yet."""
+
+        cache = self.memoize("correlations", lambda: LRUCache(
+            CORRELATION_CACHE_SIZE, sizeof=lambda matrix: 1))
+        if query.strip():
+            key = (repr(compile_filter(query, self.get_filter_index())),
+                   method)
+        else:
+            key = ("", method)
+        matrix = cache.get(key)
+        if matrix is None:
+            df = self.df.iloc[self.get_query_rows(query)] if query.strip() \
+                else self.df
+            matrix = CorrelationMatrix(df, method)
+            cache.put(key, matrix)
+        return matrix.get(columns)
+
+    def get_aggregation_cube(self) -> AggregationCube:
+        """Get the sums, means and counts of every numeric column per
+        human development group and ISO, built once per version"""
+
+        return self.memoize("aggregation_cube",
+                            lambda: AggregationCube(self.df))
+
+    def get_filter_index(self) -> FilterIndex:
+        """Get the column indexes of this dataset version"""
+
+        return self.memoize("filter_index", lambda: FilterIndex(self.df))
+
+    def get_sort_order(self, column: str) -> np.ndarray:
+        """Get the argsort permutation of a column, built once per version"""
+
+        return self.get_filter_index().get_sorted(column)[0]
+
+    def get_sorted_rows(self, rows: np.ndarray, column: str,
+                        descending: bool = False) -> np.ndarray:
+        """Sort row positions by a column without sorting again, the cached
+        permutation is intersected with the rows"""
+
+        order = self.get_sort_order(column)
+        if descending:
+            order = order[::-1]
+        if len(rows) == len(order):  # Every row, nothing to intersect
+            return order.copy()
+        mask = np.zeros(len(order), dtype=bool)
+        mask[rows] = True
+        return order[mask[order]]
+
+    def get_display_rows(self) -> list:
+        """Get the rows of the dataset with the numbers as 2 decimal text"""
+
+        df = self.df.astype(object)
+        for column in self.df.select_dtypes("float").columns:
+            df[column] = np.char.mod("%.2f", self.df[column].to_numpy())
+        return df.values.tolist()
+
+    def get_statistics(self, mask: Any = None) -> pd.DataFrame:
+        """Get the descriptive statistics of every numeric column, for the
+        whole dataset (memoized) or for the rows selected by a boolean mask"""
+
+        if mask is None:
+            return self.memoize("statistics",
+                                lambda: self.compute_statistics(self.df))
+        return self.compute_statistics(self.df[np.asarray(mask, dtype=bool)])
+
+    @staticmethod
+    def compute_statistics(df: pd.DataFrame) -> pd.DataFrame:
+        """Compute all moments and quartiles of the numeric columns at once"""
+
+        numeric = df.select_dtypes("number")
+        index = ["mean", "std", "min", "max", "25%", "50%", "75%"]
+        values = numeric.to_numpy()
+        if not len(values):
+            return pd.DataFrame(np.nan, index=index, columns=numeric.columns)
+
+        stats = np.vstack([values.mean(axis=0), values.std(axis=0),
+                           values.min(axis=0), values.max(axis=0),
+                           np.quantile(values, [0.25, 0.5, 0.75], axis=0)])
+        return pd.DataFrame(stats, index=index, columns=numeric.columns)
+
     def get_descriptive_statistics(self) -> str:
-        """Get the descriptive statistics"""
-
-        text = ""
-        for column in self.df.describe().columns:
-            text += column
-            text += ":\n"
-            text += f"mean {np.mean(self.df.loc[:, column]):.2f}\n"
-            text += f"std {np.std(self.df.loc[:, column]):.2f}\n"
-            text += f"min {np.min(self.df.loc[:, column]):.2f}\n"
-            text += f"max {np.max(self.df.loc[:, column]):.2f}\n"
-            text += f"25% {np.quantile(self.df.loc[:, column], 0.25):.2f}\n"
-            text += f"50% {np.quantile(self.df.loc[:, column], 0.5):.2f}\n"
-            text += f"75% {np.quantile(self.df.loc[:, column], 0.75):.2f}\n"
-            text += "\n"
-        return text
+        """Get the descriptive statistics as text"""
+
+        def to_text() -> str:
+            stats = self.get_statistics()
+            return "".join(
+                f"{column}:\n"
+                + "".join(f"{name} {value:.2f}\n"
+                          for name, value in stats[column].items())
+                + "\n" for column in stats.columns)
+
+        return self.memoize("statistics_text", to_text)
 
     def get_network_graph(self, col: str, color1: str, color2: str,
-                          color3: str, color4: str) -> nx.Graph:
-        """Get the network graph"""
+                          color3: str, color4: str,
+                          sample_size: int = NETWORK_SAMPLE_SIZE,
+                          seed: int = None) -> nx.Graph:
+        """Get the network graph of a random sample of countries, every
+        country when sample_size is None"""
+
+        df = self.df
+        n_rows = len(df)
+        if sample_size is None or sample_size >= n_rows:
+            positions = np.random.default_rng(seed).permutation(n_rows)
+        else:
+            positions = np.random.default_rng(seed).choice(
+                n_rows, sample_size, replace=False)
+
+        groups = df["Human_development"].to_numpy(dtype=object)[positions]
+        isos = df["ISO"].to_numpy(dtype=object)[positions]
+        weights = df[col].to_numpy(dtype=np.float64)[positions]
+        # Widened float32 values carry noise (43.29999923706055) into the
+        # edge labels, rounding them like the display gives 43.3 back
+        weights = round_values(weights * 40 if col == "GII" else weights)
+
+        colors = {"Very high": color1, "High": color2,
+                  "Medium": color3, "Low": color4}
+        colors.update(dict.fromkeys(isos, "#EA168E"))
+        # Same node order as adding each row's group and country in turn
+        nodes = dict.fromkeys(np.column_stack([groups, isos]).ravel())
 
         G = nx.Graph()  # Create an empty graph
-        for row_index in self.df.sample(15).index:
-            temp_1 = self.df.loc[row_index, "Human_development"]
-            G.add_node(temp_1)
-            temp_2 = self.df.loc[row_index, "ISO"]
-            G.add_node(temp_2)
-            if col == "GII":
-                weight = round(self.df.loc[row_index, col] * 40, 2)
-            else:
-                weight = self.df.loc[row_index, col]
+        G.add_nodes_from((node, {"color": colors[node]} if node in colors
+                          else {}) for node in nodes)
+        G.add_weighted_edges_from(zip(groups, isos, weights.tolist()))
+        return G
+
+    def get_similarity_index(self, columns: tuple) -> tuple:
+        """Get a KD-tree over the standardized indicator columns of every
+        country and the standardized vectors it was built on"""
+
+        def build() -> tuple:
+            from sklearn.neighbors import KDTree
+
+            values = self.df[list(columns)].to_numpy(dtype=np.float64)
+            std = values.std(axis=0)
+            std[std == 0] = 1.0  # A constant column adds no distance
+            scaled = (values - values.mean(axis=0)) / std
+            return KDTree(scaled), scaled
+
+        return self.memoize(("similarity_index", tuple(columns)), build)
+
+    def get_neighbours(self, columns: tuple,
+                       k: int = SIMILARITY_NEIGHBOURS) -> tuple:
+        """Get the (distances, row positions) of the k nearest other
+        countries of every country, one row per country"""
 
-            if temp_1 == "Very high":
-                G.nodes[temp_1]['color'] = color1
+        def query() -> tuple:
+            tree, scaled = self.get_similarity_index(columns)
+            count = min(k + 1, len(scaled))
+            distances, positions = tree.query(scaled, k=count)
+            # Drop each country itself, or its farthest match when an
+            # identical country came first
+            own = positions == np.arange(len(scaled))[:, None]
+            own[~own.any(axis=1), -1] = True
+            keep = ~own
+            shape = (len(scaled), count - 1)
+            return distances[keep].reshape(shape), \
+                positions[keep].reshape(shape)
 
-            elif temp_1 == "High":
-                G.nodes[temp_1]['color'] = color2
+        return self.memoize(("similarity_neighbours", tuple(columns), k),
+                            query)
 
-            elif temp_1 == "Medium":
-                G.nodes[temp_1]['color'] = color3
+    def get_similarity_graph(self, columns: tuple, k: int, color1: str,
+                             color2: str, color3: str,
+                             color4: str) -> nx.Graph:
+        """Get the graph linking every country to the k countries with the
+        most similar indicators, coloured by human development group"""
 
-            elif temp_1 == "Low":
-                G.nodes[temp_1]['color'] = color4
+        distances, positions = self.get_neighbours(tuple(columns), k)
+        isos = self.df["ISO"].to_numpy(dtype=object)
+        groups = self.df["Human_development"].to_numpy(dtype=object)
+        colors = {"Very high": color1, "High": color2,
+                  "Medium": color3, "Low": color4}
 
-            G.nodes[temp_2]['color'] = "#EA168E"
-            G.add_weighted_edges_from([(temp_1, temp_2, weight)])
+        G = nx.Graph()  # Create an empty graph
+        G.add_nodes_from((iso, {"color": colors.get(group, "black")})
+                         for iso, group in zip(isos, groups))
+        sources = np.repeat(isos, positions.shape[1])
+        G.add_weighted_edges_from(zip(sources, isos[positions.ravel()],
+                                      np.round(distances.ravel(), 2)
+                                      .tolist()))
         return G
 
+    def get_gram_matrix(self) -> GramMatrix:
+        """Get the cross-products of the numeric columns of this version"""
+
+        return self.memoize("gram_matrix", lambda: GramMatrix(self.df))
+
+    def get_fold_moments(self, folds: int = CV_FOLDS) -> FoldMoments:
+        """Get the per-fold moments of the numeric columns of this version"""
+
+        return self.memoize(("fold_moments", folds),
+                            lambda: FoldMoments(self.df, folds, CV_SEED))
+
+    def search_models(self, target: str, method: str = "subsets",
+                      max_size: int = 3, rank_by: str = "AIC",
+                      folds: int = CV_FOLDS,
+                      workers: int = None) -> pd.DataFrame:
+        """Rank models of the target over subsets of the numeric columns
+
+        method is "subsets" (every subset up to max_size columns, spread
+        over a process pool), "forward" or "backward" (stepwise). Every
+        model gets R2, adjusted R2, AIC and a cross-validated RMSE."""
+
+        moments = self.get_fold_moments(folds)
+        if method == "subsets":
+            search = lambda: search_subsets(moments, target, moments.columns,
+                                            max_size, rank_by, workers)
+        elif method in ("forward", "backward"):
+            search = lambda: search_stepwise(moments, target,
+                                             moments.columns, method,
+                                             max_size, rank_by)
+        else:
+            raise ValueError(f"Unknown search method {method}")
+        return self.memoize(("model_search", target, method, max_size,
+                             rank_by, folds), search)
+
+    def get_model(self, target: str, inputs: tuple) -> LinearFit:
+        """Get a model of the target fitted on the input columns
+
+        Fits are solved from the Gram matrix of this dataset version, so no
+        fit reads the rows again, and are kept in an LRU cache keyed by
+        (target, inputs), the regression mode only decides the inputs.
+        Fitted models are never changed, so callers can share them."""
+
+        cache = self.memoize("models", lambda: LRUCache(
+            MODEL_CACHE_SIZE, sizeof=lambda model: 1))
+        key = (target, tuple(inputs))
+        model = cache.get(key)
+        if model is None:
+            model = self.get_gram_matrix().fit(target, inputs)
+            cache.put(key, model)
+        return model
+
     def regression(self, mode: str = "", options: dict = None,
                    values: dict = None) -> float:
         """Perform the regression"""
 
-        result: float = 0.0
-        if mode == "Simple Linear Regression":
-            X = self.df[[options["input1"]]]
-            y = self.df[options["target"]]
-            self.model.fit(X, y)
-            result = self.model.predict([[values["input1"]]])
-
-        elif mode == "Multiple Linear Regression":
-            X = self.df[[options["input1"], options["input2"], options["input3"]]]
-            y = self.df[options["target"]]
-            self.model.fit(X, y)
-            result = self.model.predict([[values["input1"], values["input2"],
-                                   values["input3"]]])
+        fields = REGRESSION_INPUTS.get(mode)
+        if fields is None:
+            return 0.0
+
+        model = self.get_model(options["target"],
+                               tuple(options[field] for field in fields))
+        result = model.predict([[values[field] for field in fields]])
         return round(result[0], 4)
+
+    def get_uncertainty(self, target: str, inputs: tuple,
+                        n_boot: int = BOOTSTRAP_SAMPLES,
+                        workers: int = None) -> ModelUncertainty:
+        """Get the k-fold CV error and the bootstrap fits of a model
+
+        They are kept in the same LRU cache as the fitted models, so they
+        are computed once per (target, inputs) and dataset version."""
+
+        cache = self.memoize("models", lambda: LRUCache(
+            MODEL_CACHE_SIZE, sizeof=lambda model: 1))
+        inputs = tuple(inputs)
+        key = ("uncertainty", target, inputs, n_boot)
+        uncertainty = cache.get(key)
+        if uncertainty is None:
+            moments = self.get_fold_moments()
+            fold_rmse = moments.cross_validate(target, inputs)
+            coefs, intercepts = bootstrap(self.df, target, inputs, n_boot,
+                                          CV_SEED, workers)
+            uncertainty = ModelUncertainty(self.get_model(target, inputs),
+                                           fold_rmse, moments.counts, coefs,
+                                           intercepts, CV_SEED)
+            cache.put(key, uncertainty)
+        return uncertainty
+
+    def regression_interval(self, mode: str = "", options: dict = None,
+                            values: dict = None,
+                            level: float = 0.95) -> tuple:
+        """Perform the regression, return the (prediction, lower, upper,
+        CV RMSE), the bounds are the bootstrap confidence interval"""
+
+        fields = REGRESSION_INPUTS.get(mode)
+        if fields is None:
+            return 0.0, 0.0, 0.0, 0.0
+
+        uncertainty = self.get_uncertainty(
+            options["target"], tuple(options[field] for field in fields))
+        X = [[values[field] for field in fields]]
+        lower, upper = uncertainty.predict_interval(X, level)
+        return (round(uncertainty.fit.predict(X)[0], 4),
+                round(lower[0], 4), round(upper[0], 4),
+                round(uncertainty.cv_rmse, 4))
+
+    def predict_batch(self, mode: str, options: dict, data: Any,
+                      chunk_size: int = PREDICT_CHUNK_ROWS) -> Iterator:
+        """Predict many input rows (a 2-D array, a DataFrame or a CSV path)
+        with one vectorized call per chunk, yielding the predictions"""
+
+        inputs = tuple(options[field] for field in REGRESSION_INPUTS[mode])
+        model = self.get_model(options["target"], inputs)
+        for _, X in self.iter_input_chunks(data, inputs, chunk_size):
+            yield model.predict(X)
+
+    def score_csv(self, mode: str, options: dict, path: str,
+                  out_path: str = None,
+                  chunk_size: int = PREDICT_CHUNK_ROWS) -> tuple:
+        """Write a copy of a CSV file with a prediction column, chunk by
+        chunk, return (output path, number of rows scored)"""
+
+        inputs = tuple(options[field] for field in REGRESSION_INPUTS[mode])
+        model = self.get_model(options["target"], inputs)
+        out_path = out_path or f"{os.path.splitext(path)[0]}_scored.csv"
+        rows = 0
+        for chunk, X in self.iter_input_chunks(path, inputs, chunk_size):
+            chunk = chunk.assign(
+                **{f"Predicted_{options['target']}": model.predict(X)})
+            chunk.to_csv(out_path, mode="a" if rows else "w",
+                         header=not rows, index=False)
+            rows += len(chunk)
+        return out_path, rows
+
+    @staticmethod
+    def iter_input_chunks(data: Any, inputs: tuple,
+                          chunk_size: int) -> Iterator:
+        """Split a 2-D array, a DataFrame or a CSV path into
+        (frame, input array) chunks"""
+
+        if isinstance(data, (str, os.PathLike)):
+            chunks = pd.read_csv(data, chunksize=chunk_size)
+        elif isinstance(data, pd.DataFrame):
+            chunks = (data.iloc[start:start + chunk_size]
+                      for start in range(0, len(data), chunk_size))
+        else:
+            array = np.asarray(data, dtype=np.float64)
+            if array.ndim == 1:
+                array = array.reshape(-1, len(inputs))
+            chunks = (pd.DataFrame(array[start:start + chunk_size])
+                      for start in range(0, len(array), chunk_size))
+
+        for chunk in chunks:
+            if set(inputs) <= set(chunk.columns):
+                X = chunk[list(inputs)]
+            elif chunk.shape[1] == len(inputs):  # Unnamed, take them in order
+                X = chunk
+            else:
+                missing = [name for name in inputs if name not in chunk]
+                raise ValueError(f"Missing input columns: "
+                                 f"{', '.join(missing)}")
+            yield chunk, X.to_numpy(dtype=np.float64)
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional
+from PIL import Image
+from lruCache import LRUCache
+
+PLOT_CACHE_BYTES: int = 128 * 2 ** 20  # Budget of the rendered plots in memory
+
+
+class PlotCache:
+    """This class keeps rendered plots by their plot spec
+
+    A spec is a tuple of everything a plot depends on (graph and plot type,
+    columns, colours, dataset key, size). Images are kept in memory in an
+    LRU bounded by their raw size, and as PNG files in a directory if one
+    is given, so they also survive a restart."""
+
+    def __init__(self, budget: int = PLOT_CACHE_BYTES,
+                 directory: str = None):
+        # Set the attributes
+        self.memory: LRUCache = LRUCache(budget, sizeof=lambda image: (
+            image.width * image.height * len(image.getbands())))
+        self.directory: Optional[str] = directory  # PNG files, optional
+
+    @staticmethod
+    def get_key(spec: tuple) -> str:
+        """Hash a plot spec, its repr is canonical for tuples of strings
+        and numbers"""
+
+        return hashlib.sha1(repr(spec).encode()).hexdigest()
+
+    def get_path(self, key: str) -> Optional[str]:
+        """Get the PNG file of a key, None without a directory"""
+
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, f"{key}.png")
+
+    def get(self, spec: tuple, disk: bool = True) -> Optional[Image.Image]:
+        """Get a rendered plot, None if it is not cached"""
+
+        key = self.get_key(spec)
+        image = self.memory.get(key)
+        path = self.get_path(key)
+        if image is None and disk and path and os.path.exists(path):
+            with Image.open(path) as file:
+                image = file.convert("RGBA")
+            self.memory.put(key, image)
+        return image
+
+    def put(self, spec: tuple, image: Image.Image) -> None:
+        """Keep a rendered plot"""
+
+        key = self.get_key(spec)
+        self.memory.put(key, image)
+        path = self.get_path(key)
+        if path and not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp = tempfile.mkstemp(suffix=".png", dir=self.directory)
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    image.save(file, format="PNG")
+                os.replace(temp, path)  # Readers never see half a file
+            except OSError:
+                if os.path.exists(temp):
+                    os.remove(temp)
+
+    def clear(self) -> None:
+        """Forget the plots kept in memory"""
+
+        self.memory.clear()
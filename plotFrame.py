@@ -1,14 +1,20 @@
+import random
 from tkinter import colorchooser
 from tkinter import ttk
 from typing import Optional, Any
 
 import customtkinter as ct
-import networkx as nx
-import seaborn as sns
+from PIL import Image
 from matplotlib import pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
 from facadeController import FacadeController
+from graphPlotter import GraphPlotter
+from plotCache import PlotCache
+from renderPipeline import RenderJob, RenderPipeline
+from treeTable import TreeTable
+
+RENDER_POLL_MS: int = 16  # Check for a finished plot every frame at 60 fps
+PLOT_CACHE: PlotCache = PlotCache()  # Rendered plots of every plot tab
 
 
 class PlotFrame(ct.CTkToplevel):
@@ -23,13 +29,20 @@ class PlotFrame(ct.CTkToplevel):
 
         # Set the attributes
         self._facade: FacadeController = FacadeController()
-        self.figure: Any = None
         self.options: dict = {}
-        self.df: Any = self.facade.get_df()
+        self.plotter: GraphPlotter = GraphPlotter(self.facade)
 
         # Set the widgets
-        self.canvas: Optional[FigureCanvasTkAgg] = None
-        self.tree: Optional[ttk.Treeview] = None
+        self.pipeline: Optional[RenderPipeline] = None  # Draws the plots
+        self.render_job: Optional[RenderJob] = None  # Latest plot asked for
+        self.plot_label: Optional[ct.CTkLabel] = None  # Shows the plot
+        self.plot_image: Optional[ct.CTkImage] = None  # Image of the plot
+        self.tree: Optional[TreeTable] = None
+        self.tree_mode: Optional[str] = None  # Appearance of the tree style
+        self.tree_rows: Any = None  # Row positions of the current query
+        self.tree_query: str = ""  # Current (valid) query of the tree
+        self.sort_column: Optional[str] = None  # Column the tree is sorted by
+        self.sort_descending: bool = False  # Sort direction
         self.entry: Optional[ct.CTkEntry] = None
         self.prop_frame: Optional[ct.CTkFrame] = None
         self.graph_frame: Optional[ct.CTkFrame] = None
@@ -37,6 +50,8 @@ class PlotFrame(ct.CTkToplevel):
         self.opt_2: ct.StringVar = ct.StringVar(value="Plot Type")
         self.opt_3: ct.StringVar = ct.StringVar(value="Value")
         self.opt_4: ct.StringVar = ct.StringVar(value="Value 2")
+        self.progress: Optional[ct.CTkProgressBar] = None  # Layout progress
+        self.network_seed: int = random.randrange(2 ** 32)  # Sample seed
 
         # Set the tabs
         self.tab_view = ct.CTkTabview(self, height=660, width=1260)
@@ -57,6 +72,13 @@ class PlotFrame(ct.CTkToplevel):
         self.facade.create_btn(self, text="Close", row=1, column=0,
                                command=self.destroy, size=10, y_pad=(0, 10))
 
+    def destroy(self) -> None:
+        """Stop the render worker with the window"""
+
+        if self.pipeline:
+            self.pipeline.shutdown()
+        super().destroy()
+
     @property
     def facade(self) -> FacadeController:
         """FacadeController"""
@@ -65,6 +87,10 @@ class PlotFrame(ct.CTkToplevel):
     def create_tree(self) -> None:
         """This method is responsible for creating the treeview."""
 
+        self.tree = TreeTable(self.tab_view.tab("DataFrame"), page_size=20,
+                              on_sort=self.sort_tree)
+        self.tree.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
+        self.tree.scrollbar.grid(row=0, column=1, sticky="ns")
         self.init_tree()
         text = ct.StringVar(value="Insert column")
         frame = ct.CTkFrame(self.tab_view.tab("DataFrame"), height=90,
@@ -83,7 +109,7 @@ class PlotFrame(ct.CTkToplevel):
         self.facade.create_opt_menu(frame, variable=text,
                                     command=lambda x: self.entry.insert(ct.END,
                                                                         x),
-                                    value=self.facade.get_df().columns, row=1,
+                                    value=self.facade.get_columns(), row=1,
                                     column=1, y_pad=10)
 
         self.facade.create_btn(frame, text="Confirm",
@@ -91,18 +117,63 @@ class PlotFrame(ct.CTkToplevel):
                 self.entry.get()),
                                size=15, y_pad=10)
         self.facade.create_btn(frame, text="Reset", row=1, column=3,
-                               command=lambda: self.entry.delete(0, ct.END),
+                               command=self.reset_tree,
                                size=15, y_pad=10)
 
     def init_tree(self, event: str = None) -> None:
-        """This method is responsible for initializing the treeview."""
+        """This method is responsible for showing the rows of a query in the
+        treeview, only the rows that changed are updated."""
 
-        style = ttk.Style()
-        columns = None
-        rows = None
+        self.set_tree_style()
+
+        # get the positions of the rows, the table fetches what it shows
+        try:
+            rows = self.facade.get_row_positions(event)
+        except SyntaxError as error:  # FilterError carries the position
+            self.entry.delete(0, ct.END)
+            self.entry.insert(0, f"Invalid input: {error}")
+            offset = error.offset  # error is unbound after the except
+            self.after(1200, lambda: self.update_entry(event, offset))
+            return
+
+        self.tree_rows = rows
+        self.tree_query = event or ""
+        self.show_tree()
+
+    def show_tree(self) -> None:
+        """This method is responsible for showing the (sorted) rows."""
+
+        rows = self.tree_rows
+        if self.sort_column:
+            rows = self.facade.sort_rows(rows, self.sort_column,
+                                         self.sort_descending)
+        self.tree.set_data(
+            tuple(self.facade.get_columns()), rows,
+            lambda keys: self.facade.get_df(rows=keys).values.tolist(),
+            version=self.facade.get_version())
+        self.tree.show_sort(self.sort_column, self.sort_descending)
+
+    def sort_tree(self, column: str) -> None:
+        """This method is responsible for sorting the treeview by a column,
+        clicking the same heading again reverses the order."""
+
+        if column == self.sort_column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column, self.sort_descending = column, False
+        self.show_tree()
+
+    def set_tree_style(self) -> None:
+        """This method is responsible for styling the treeview according to
+        the appearance mode, the style is only changed with the mode."""
+
+        mode = ct.get_appearance_mode()
+        if mode == self.tree_mode:
+            return
+        self.tree_mode = mode
 
-        # set style according to the appearance mode
-        if ct.get_appearance_mode() == "Dark":
+        style = ttk.Style()
+        if mode == "Dark":
             style.configure("Treeview", background="Black", foreground="white",
                             fieldbackground="#C47AFF")
             style.map("Treeview", background=[("selected", "#C47AFF")])
@@ -111,41 +182,21 @@ class PlotFrame(ct.CTkToplevel):
                             fieldbackground="#E80F88")
             style.map("Treeview", background=[("selected", "#E80F88")])
 
-        # get columns and rows
-        try:
-            columns = tuple(self.facade.get_df(event).columns)
-            rows = tuple(self.facade.get_df(event).values.tolist())
-        except SyntaxError:
-            self.entry.delete(0, ct.END)
-            self.entry.insert(0, "Invalid input, try again")
-            self.after(1200, self.update_entry)
+    def reset_tree(self) -> None:
+        """This method is responsible for clearing the query."""
 
-        self.tree = ttk.Treeview(self.tab_view.tab("DataFrame"),
-                                 columns=columns,
-                                 show='headings', height=20)
-
-        scrollbar = ttk.Scrollbar(self.tab_view.tab("DataFrame"),
-                                  orient="vertical",
-                                  command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-
-        # set column headings
-        for column in columns:
-            self.tree.heading(column, text=column)
-            self.tree.column(column, width=98, anchor="center")
-
-        self.tree.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
-        scrollbar.grid(row=0, column=1, sticky="ns")
-
-        # insert values into a tree
-        for row in rows:
-            self.tree.insert(parent='', index=0, values=row)
+        self.entry.delete(0, ct.END)
+        self.init_tree()
 
-    def update_entry(self) -> None:
+    def update_entry(self, text: str = None, offset: int = None) -> None:
         """This method is responsible for updating the entry widget."""
 
         self.entry.delete(0, ct.END)
-        self.entry.insert(0, "ISO in ['ISL','SWE'] or 0.05 > GII > 0.01")
+        self.entry.insert(0, text or "ISO in ['ISL','SWE'] or 0.05 > GII > "
+                                     "0.01")
+        if offset:  # Put the cursor where the filter went wrong
+            self.entry.focus()
+            self.entry.icursor(offset - 1)
 
     def opt_changed(self, value) -> None:
         """This method is responsible for changing the options in the"""
@@ -167,8 +218,14 @@ class PlotFrame(ct.CTkToplevel):
 
         elif self.options["Graph"] == "Network":
             self.opt_3.set("Value")
+            self.opt_4.set("Countries")
             self.create_network_opt()
 
+        elif self.options["Graph"] == "Similarity":
+            self.opt_3.set("Indicators")
+            self.opt_4.set("Neighbours")
+            self.create_similarity_opt()
+
     def create_dist_opt(self, value=None) -> None:
         """This method is responsible for creating the options for the
         distribution graph."""
@@ -234,7 +291,17 @@ class PlotFrame(ct.CTkToplevel):
                                         value=self.facade.get_corr_plot(),
                                         row=2, column=0)
 
-        if self.options.get("Plot") in self.facade.get_corr_plot():
+        if self.options.get("Plot") == "heatmap":
+            self.facade.create_opt_menu(self.option_frame, variable=self.opt_3,
+                                        command=lambda
+                                            x: self.create_corr_opt(
+                                            ("Method", x)),
+                                        value=["Pearson", "Spearman"],
+                                        row=4,
+                                        column=0)
+            self.create_prop_btn(command=self.plot_corr_graph)
+
+        elif self.options.get("Plot") in self.facade.get_corr_plot():
             self.facade.create_opt_menu(self.option_frame, variable=self.opt_3,
                                         command=lambda
                                             x: self.create_corr_opt(
@@ -256,9 +323,11 @@ class PlotFrame(ct.CTkToplevel):
         """This method is responsible for creating the options for the
         network graph."""
 
-        self.plot_network_graph()
         if value:
             self.options[value[0]] = value[1]
+            if value[0] == "Sample":  # Draw other countries
+                self.network_seed = random.randrange(2 ** 32)
+        self.plot_network_graph()
         if self.options.get("Graph") == "Network":
             self.facade.create_opt_menu(self.option_frame, variable=self.opt_2,
                                         command=lambda
@@ -275,141 +344,141 @@ class PlotFrame(ct.CTkToplevel):
                                         value=self.facade.get_columns()[2:-1],
                                         row=4,
                                         column=0)
+            self.facade.create_opt_menu(self.option_frame, variable=self.opt_4,
+                                        command=lambda
+                                            x: self.create_network_opt(
+                                            ("Sample", x)),
+                                        value=self.facade.get_network_samples(),
+                                        row=6,
+                                        column=0)
 
-            layout = self.options.get("NPlot", "spring_layout")
-            func = self.facade.get_network_func(layout)
-            self.create_prop_btn(command=lambda: self.plot_network_graph(func))
+            layout = self.options.get("NPlot", "spring")
+            self.create_prop_btn(
+                command=lambda: self.plot_network_graph(layout))
+
+    def create_similarity_opt(self, value=None) -> None:
+        """This method is responsible for creating the options for the
+        similarity graph."""
+
+        if value:
+            self.options[value[0]] = value[1]
+        self.facade.create_opt_menu(self.option_frame, variable=self.opt_2,
+                                    command=lambda
+                                        x: self.create_similarity_opt(
+                                        ("NPlot", x)),
+                                    value=self.facade.get_similarity_plot(),
+                                    row=2, column=0)
+        self.facade.create_opt_menu(self.option_frame, variable=self.opt_3,
+                                    command=lambda
+                                        x: self.create_similarity_opt(
+                                        ("Indicators", x)),
+                                    value=list(
+                                        self.facade.get_similarity_columns()),
+                                    row=4, column=0)
+        self.facade.create_opt_menu(self.option_frame, variable=self.opt_4,
+                                    command=lambda
+                                        x: self.create_similarity_opt(
+                                        ("Neighbours", x)),
+                                    value=["3", "5", "10"],
+                                    row=6, column=0)
+
+        layout = self.options.get("NPlot", "spring")
+        self.create_prop_btn(
+            command=lambda: self.plot_similarity_graph(layout))
 
     def plot_dis_graph(self) -> None:
         """This method is responsible for plotting the distribution graph."""
 
-        if self.figure:  # Clear the figure if it is not empty
-            self.figure.clf()
-
-        colors = self.get_colors()
-        sns.set_style("darkgrid")
-        if self.options.get("Plot", "histplot") != "boxplot":
-            plot = self.facade.get_plot_func(
-                self.options.get("Plot", "histplot"))(
-                data=self.df,
-                x=self.df[self.options.get("Column", "GII")],
-                hue='Human_development',
-                palette=colors,
-            )
-        else:
-            plot = self.facade.get_plot_func(
-                self.options.get("Plot", "histplot"))(
-                data=self.df,
-                y=self.df[self.options.get("Column", "GII")],
-                hue='Human_development',
-                palette=colors,
-            )
-        plot.set(
-            title=f"A graph show the frequency of {self.options.get('Column', 'GII').replace('_', ' ')}")
-        self.figure = plot.get_figure()
-        plot.set_xlabel(self.options.get('Column', 'GII'))
-        plot.set_ylabel("Frequency")
-
-        self.create_canvas()
+        self.render(*self.plotter.get_graph("Distribution", self.options))
 
     def plot_everyday_graph(self) -> None:
         """This method is responsible for plotting the everyday graph."""
 
-        if self.figure:  # Clear the figure if it is not empty
-            self.figure.clf()
-
-        sns.set_style("darkgrid")
-        fig = plt.figure()
-        ax = fig.add_axes([0.1, 0.1, 0.8, 0.8])
-        colors = self.get_colors()
-
-        if self.options.get("Plot") == "stackbar":  # Plot the stacked bar plot
-            # Calculate the average of values in each country
-            # (In case that there are duplicated country)
-
-            col_sum = self.df.groupby("ISO")[
-                self.options.get("Column", "GII")].mean()
-
-            # Select the top 10 columns based on the average of values
-            top_10_cols = col_sum.sort_values(ascending=False)[
-                          :10].index.tolist()
-
-            # Create a pivot table with only the top 10 columns
-            pivot_table = self.df.pivot_table(index="Human_development",
-                                              columns="ISO",
-                                              values=self.options.get("Column",
-                                                                      "GII"),
-                                              aggfunc="sum")[top_10_cols]
-
-            # Plot the stacked bar plot
-            ax = pivot_table.plot(kind="bar", stacked=True, figsize=(7, 5),
-                                  )
-
-            # Set the title and labels
-            ax.set_title(
-                f"A graph showing proportion of {self.options.get('Column', 'GII')} of Top 10 Human Development by ISO")
-            ax.set_xlabel("Human Development")
-            ax.set_ylabel("Proportion")
-            ax.legend(loc='best')
-
-        else:  # Plot the pie chart
-            ax.pie(self.df.groupby("Human_development")[
-                       self.options.get("Column", "GII")].agg("sum"),
-                   labels=self.df.Human_development.unique(),
-                   autopct='%1.1f%%',
-                   startangle=90,
-                   colors=colors)
-            ax.axis('equal')
-            ax.set_title(f'A graph show proportion of {self.options.get("Column", "GII")} of Human Development')
-
-        self.figure = ax.get_figure()
-        self.create_canvas()
+        self.render(*self.plotter.get_graph("Everyday", self.options))
 
     def plot_corr_graph(self) -> None:
-        """This method is responsible for plotting the correlation graph."""
-
-        if self.figure:  # Clear the figure if it is not empty
-            self.figure.clf()
-
-        sns.set_style("darkgrid")
-        colors = self.get_colors()
-        plot = self.facade.get_plot_func(self.options.get("Plot",
-                                                          "scatterplot")) \
-            (self.df, x=self.options.get("Column1", "GII"),
-             y=self.options.get("Column2", "Rank"),
-             hue="Human_development",
-             palette=colors, )
+        """This method is responsible for plotting the correlation graph,
+        the heatmap is drawn from the rows the DataFrame tab shows."""
 
-        plot.set(title=f"A graph show the correlation of {self.options.get('Column1', 'GII')} and {self.options.get('Column2', 'Rank')}".replace('_', ' '))
-        self.figure = plot.get_figure()
-        plot.set_xlabel(self.options.get('Column1', 'GII'))
-        plot.set_ylabel(self.options.get('Column2', 'Rank'))
+        self.render(*self.plotter.get_graph(
+            "Correlation", {**self.options, "Query": self.tree_query}))
 
-        self.create_canvas()
-
-    def plot_network_graph(self, layout=nx.circular_layout) -> None:
+    def plot_network_graph(self, layout: str = "circular") -> None:
         """This method is responsible for plotting the network graph."""
 
-        if self.figure:  # Clear the figure if it is not empty
-            self.figure.clf()
-
-        col = self.options.get("Column1", "GII")
-        colors = self.get_colors()
-        G2 = self.facade.get_network_graph(col, colors[0], colors[1],
-                                           colors[2], colors[3])
-
-        node_colors_list = [G2.nodes[n].get('color', 'black') for n in G2.nodes()]
-        edge_width_list = [G2.edges[n]['weight'] / 50 for n in G2.edges()]
-        edge_labels = nx.get_edge_attributes(G2, "weight")
-
-        pos2 = layout(G2)
-        nx.draw_networkx_nodes(G2, pos2, node_size=400,
-                               node_color=node_colors_list)
-        nx.draw_networkx_edges(G2, pos2, width=edge_width_list)
-        nx.draw_networkx_labels(G2, pos2, font_size=15)
-        nx.draw_networkx_edge_labels(G2, pos2, edge_labels)
-        plt.title(f"Random {col} and Human Development relation of 15 countries")
-        self.create_canvas()
+        self.render(*self.plotter.get_graph(
+            "Network", {**self.options, "NPlot": layout,
+                        "Seed": self.network_seed}))
+
+    def plot_similarity_graph(self, layout: str = "spring") -> None:
+        """This method is responsible for plotting the similarity graph."""
+
+        self.render(*self.plotter.get_graph(
+            "Similarity", {**self.options, "NPlot": layout,
+                           "Seed": self.network_seed}))
+
+    def render(self, prepare: Any, draw: Any, spec: tuple = None,
+               palette: tuple = None, redraw: Any = None) -> None:
+        """Render a plot on the render worker and show it when it is done,
+        a newer plot cancels this one. A plot with a spec is kept in the
+        plot cache, a new palette of the same plot only recolours it."""
+
+        job = self.pipeline.submit(prepare, draw, spec, palette, redraw)
+        self.render_job = job
+        self.after(RENDER_POLL_MS, lambda: self.poll_render(job))
+
+    def poll_render(self, job: RenderJob) -> None:
+        """Show the image of a render once it is finished, unless a newer
+        plot was asked for meanwhile"""
+
+        if job is not self.render_job or not self.winfo_exists():
+            return
+        if not job.future.done():
+            self.show_progress()
+            self.after(RENDER_POLL_MS, lambda: self.poll_render(job))
+            return
+        self.hide_progress()
+        try:
+            image = self.pipeline.get_result(job)
+        except Exception as error:  # The plot failed, say why in its place
+            plt.close("all")
+            self.show_render_error(error)
+            return
+        plt.close("all")  # Figures some library opened through pyplot
+        if image is not None:
+            self.plot_image = ct.CTkImage(light_image=image,
+                                          dark_image=image, size=image.size)
+            self.plot_label.configure(image=self.plot_image, text="")
+
+    def show_render_error(self, error: Exception) -> None:
+        """Replace the plot by the message of the error that stopped it"""
+
+        width, height = self.pipeline.canvas.get_width_height()
+        blank = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        self.plot_image = ct.CTkImage(light_image=blank, dark_image=blank,
+                                      size=blank.size)
+        self.plot_label.configure(
+            image=self.plot_image, wraplength=width - 40,
+            text=f"This plot could not be drawn:\n"
+                 f"{type(error).__name__}: {error}")
+
+    def show_progress(self) -> None:
+        """Show a busy bar under the graph while a plot is rendered"""
+
+        if self.progress is None:
+            self.progress = ct.CTkProgressBar(self.graph_frame,
+                                              mode="indeterminate")
+        if not self.progress.winfo_ismapped():
+            self.progress.grid(row=1, column=0, padx=20, pady=(0, 20),
+                               sticky="ew")
+            self.progress.start()
+
+    def hide_progress(self) -> None:
+        """Hide the busy bar"""
+
+        if self.progress is not None:
+            self.progress.stop()
+            self.progress.grid_remove()
 
     def create_color_chooser(self, frame, row: int = 1, num: int = 0) -> None:
         """This method is responsible for creating the color chooser."""
@@ -431,15 +500,6 @@ class PlotFrame(ct.CTkToplevel):
                                         row=row, column=0, y_pad=0,
                                         text_color=color[1])
 
-    def create_canvas(self) -> None:
-        """This method is responsible for creating the canvas."""
-
-        self.figure.set_facecolor("gray")
-        self.canvas = FigureCanvasTkAgg(self.figure, self.graph_frame)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().grid(row=0, column=0, padx=20, pady=20,
-                                         sticky="nsew")
-
     def create_opt_frame(self) -> None:
         """This method is responsible for creating the option frame."""
 
@@ -457,15 +517,18 @@ class PlotFrame(ct.CTkToplevel):
                                     command=lambda x: self.opt_changed(
                                         ("Graph", x)),
                                     value=["Distribution", "Everyday",
-                                           "Correlation", "Network"])
+                                           "Correlation", "Network",
+                                           "Similarity"])
 
     def create_graph_frame(self) -> None:
         """This method is responsible for creating the graph frame."""
 
-        plt.figure(figsize=(7, 5))
         self.graph_frame = ct.CTkFrame(self.tab_view.tab("Plot"), height=580,
                                        width=800)
         self.graph_frame.grid(row=0, column=1, padx=5, pady=20, sticky="nsew")
+        self.pipeline = RenderPipeline(figsize=(7, 5), cache=PLOT_CACHE)
+        self.plot_label = ct.CTkLabel(self.graph_frame, text="")
+        self.plot_label.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
         self.plot_dis_graph()
 
     def create_prop_frame(self) -> None:
@@ -500,15 +563,6 @@ class PlotFrame(ct.CTkToplevel):
                                column=0, command=command,
                                size=15)
 
-    def get_colors(self) -> list:
-        """This method is responsible for getting the colors."""
-
-        color1 = self.options.get("Color1", "#39B5E0")
-        color2 = self.options.get("Color2", "#FB2576")
-        color3 = self.options.get("Color3", "#C9F4AA")
-        color4 = self.options.get("Color4", "#F5EA5A")
-        return [color1, color2, color3, color4]
-
     def reset_widget(self) -> None:
         """This method is responsible for resetting the widget."""
 
@@ -0,0 +1,256 @@
+from operator import attrgetter
+from typing import Callable, Iterator, Optional
+import numpy as np
+from matplotlib.artist import Artist
+from matplotlib.axes import Axes
+from matplotlib.axis import Axis
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import Collection
+from matplotlib.colors import to_rgba_array
+from matplotlib.figure import Figure
+from matplotlib.legend import Legend
+from matplotlib.lines import Line2D
+from matplotlib.patches import Patch
+from matplotlib.text import Text
+
+COLOR_TOLERANCE: float = 1 / 512  # Half a step of an 8 bit channel
+PROBE_COLORS: tuple = ("#0b1f3a", "#3a0b1f", "#1f3a0b", "#2d2d0b",
+                       "#0b2d2d", "#2d0b2d", "#123456", "#563412")
+
+
+class Recolorer:
+    """This class changes the palette of a drawn figure in place
+
+    capture draws the figure once with the artists from the first one that
+    uses a palette colour upwards (in drawing order) left out, keeps that
+    background, then draws those artists over it. The first apply draws
+    the plot once more in a probe palette, off screen and without
+    rasterizing it. The colours that follow the probe are the palette
+    slots; one that changes without being a palette colour (a colour
+    derived from it) refuses the recolour. apply then swaps only those
+    slots, restores the background and draws the artists again, like
+    blitting, without running the plot again. A colour of the style that
+    equals a palette colour (white gridlines, black labels) is left
+    alone. The axis (ticks, grid) is never recoloured."""
+
+    def __init__(self, canvas: FigureCanvasAgg):
+        # Set the attributes
+        self.canvas: FigureCanvasAgg = canvas
+        self.palette: Optional[tuple] = None  # Colours of the drawn figure
+        self.redraw: Optional[Callable] = None  # (figure, palette) -> None
+        self.axes: Optional[Axes] = None  # Axes of the palette artists
+        self.artists: list = []  # Drawn over the background, in order
+        self.slots: Optional[list] = None  # Palette slots, None until probed
+        self.background: object = None  # Pixels without the artists
+
+    @staticmethod
+    def get_rgb(colors: tuple) -> np.ndarray:
+        """Get the RGB rows of colours"""
+
+        return to_rgba_array(list(colors))[:, :3]
+
+    @classmethod
+    def get_colors(cls, artist: Artist) -> list:
+        """Get the (getter, setter) pairs of the colours of an artist, an
+        artist coloured by a colour map has none"""
+
+        if isinstance(artist, Collection):
+            if artist.get_array() is not None:
+                return []
+            return [(artist.get_facecolor, artist.set_facecolor),
+                    (artist.get_edgecolor, artist.set_edgecolor)]
+        if isinstance(artist, Patch):
+            return [(artist.get_facecolor, artist.set_facecolor),
+                    (artist.get_edgecolor, artist.set_edgecolor)]
+        if isinstance(artist, Line2D):
+            return [(artist.get_color, artist.set_color),
+                    (artist.get_markerfacecolor, artist.set_markerfacecolor),
+                    (artist.get_markeredgecolor, artist.set_markeredgecolor)]
+        if isinstance(artist, Text):
+            return [(artist.get_color, artist.set_color)]
+        return []
+
+    @classmethod
+    def get_matches(cls, color, palette: np.ndarray) -> np.ndarray:
+        """Get which palette colour (-1 for none) every colour is"""
+
+        rgba = to_rgba_array(color)
+        if not len(rgba) or not len(palette):
+            return np.full(len(rgba), -1)
+        distance = np.abs(rgba[:, None, :3] - palette[None, :, :]).max(axis=2)
+        return np.where(distance.min(axis=1) < COLOR_TOLERANCE,
+                        distance.argmin(axis=1), -1)
+
+    @classmethod
+    def uses(cls, artist: Artist, palette: np.ndarray) -> bool:
+        """Check if an artist or one of its children uses the palette"""
+
+        return any((cls.get_matches(get(), palette) >= 0).any()
+                   for child in artist.findobj()
+                   for get, _ in cls.get_colors(child))
+
+    @staticmethod
+    def get_layer(ax: Axes) -> list:
+        """Get the children of an axes Axes.draw draws, in its order"""
+
+        hidden = [ax.patch]
+        if not ax.axison:
+            hidden += [ax.xaxis, ax.yaxis]
+        if not (ax.axison and ax.get_frame_on()):
+            hidden += list(ax.spines.values())
+        return sorted((child for child in ax.get_children()
+                       if all(child is not other for other in hidden)),
+                      key=attrgetter("zorder"))
+
+    @staticmethod
+    def walk(artists: list) -> Iterator[Artist]:
+        """Get the artists and their children, the axis are left out (their
+        ticks are only made when they are drawn)"""
+
+        for artist in artists:
+            if not isinstance(artist, Axis):
+                yield from artist.findobj()
+
+    @classmethod
+    def get_probe(cls, palette: tuple) -> Optional[tuple]:
+        """Get colours as many as the palette, none of them close to one of
+        its colours, None if there are not enough"""
+
+        rgb = cls.get_rgb(palette)
+        probe = [color for color in PROBE_COLORS
+                 if (cls.get_matches(color, rgb) < 0).all()]
+        return tuple(probe[:len(palette)]) \
+            if len(probe) >= len(palette) else None
+
+    def capture(self, palette: tuple, redraw: Callable = None) -> bool:
+        """Draw the figure and keep its background, False if the palette
+        artists cannot be split from it (then it is not drawn)
+
+        redraw draws the same plot in another palette on a figure, without
+        it the figure cannot be recoloured."""
+
+        self.palette = None
+        figure = self.canvas.figure
+        rgb = self.get_rgb(palette)
+        if redraw is None or any(
+                self.uses(artist, rgb) for artist in
+                figure.texts + figure.patches + figure.lines +
+                figure.artists + figure.legends):
+            return False
+        layers = []
+        for ax in figure.axes:
+            children = self.get_layer(ax)
+            first = next((i for i, child in enumerate(children)
+                          if self.uses(child, rgb)), None)
+            if first is not None:
+                layers.append((ax, children[first:]))
+        if len(layers) != 1:  # None, or more axes than one blit can keep
+            return False
+
+        self.axes, self.artists = layers[0]
+        for artist in self.artists:
+            artist.set_animated(True)  # Left out of canvas.draw
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(figure.bbox)
+        self.draw_artists()
+        self.freeze_legends()
+        self.palette = tuple(palette)
+        self.redraw = redraw
+        self.slots = None
+        return True
+
+    def freeze_legends(self) -> None:
+        """Pin the legends where they were drawn, a legend placed with
+        loc='best' searches every data point on each draw and would find
+        the same place again. Legend.set_loc is public from matplotlib
+        3.8, before that the legends are left as they are."""
+
+        for legend in self.artists:
+            set_loc = getattr(legend, "set_loc", None)
+            if not isinstance(legend, Legend) or set_loc is None:
+                continue
+            anchor = legend.get_bbox_to_anchor()
+            frame = legend.legendPatch  # Placed in pixels by the last draw
+            set_loc(((frame.get_x() - anchor.x0) / anchor.width,
+                     (frame.get_y() - anchor.y0) / anchor.height))
+
+    def get_slots(self) -> list:
+        """Find the colours of the artists that follow the palette, by
+        drawing the plot in a probe palette, empty if the figure cannot be
+        recoloured"""
+
+        probe = self.get_probe(self.palette)
+        figure = self.canvas.figure
+        if probe is None:
+            return []
+        other = Figure(figsize=figure.get_size_inches(), dpi=figure.dpi)
+        self.redraw(other, probe)
+        if len(other.axes) != len(figure.axes):
+            return []
+        children = self.get_layer(other.axes[figure.axes.index(self.axes)])
+        drawn = list(self.walk(self.artists))
+        probed = list(self.walk(children[len(children)
+                                         - len(self.artists):]))
+        if len(drawn) != len(probed) or any(
+                type(a) is not type(b) for a, b in zip(drawn, probed)):
+            return []  # Not the same plot
+
+        old, rgb = self.get_rgb(self.palette), self.get_rgb(probe)
+        slots = []
+        for artist, twin in zip(drawn, probed):
+            for (get, set_), (get_twin, _) in zip(self.get_colors(artist),
+                                                  self.get_colors(twin)):
+                color, other_color = to_rgba_array(get()), \
+                    to_rgba_array(get_twin())
+                if color.shape != other_color.shape:
+                    return []
+                moved = np.abs(color[:, :3] - other_color[:, :3]).max(
+                    axis=1) >= COLOR_TOLERANCE if len(color) \
+                    else np.zeros(0, dtype=bool)
+                index = np.where(moved, self.get_matches(other_color, rgb),
+                                 -1)
+                if (moved & (index < 0)).any() or (np.abs(
+                        color[moved, :3] - old[index[moved]]).max(axis=1)
+                        >= COLOR_TOLERANCE).any():
+                    return []  # Derived from the palette, not one of it
+                if moved.any():
+                    slots.append((set_, index, color,
+                                  isinstance(artist, Collection)))
+        return slots
+
+    def apply(self, palette: tuple) -> bool:
+        """Swap the captured palette for a new one and redraw the palette
+        artists, False if the figure cannot be recoloured"""
+
+        if self.palette is None or len(palette) != len(self.palette):
+            return False
+        if self.slots is None:
+            self.slots = self.get_slots()
+        if not self.slots:
+            return False
+
+        new = self.get_rgb(palette)
+        for set_, index, color, collection in self.slots:
+            rgba = color.copy()
+            rgba[index >= 0, :3] = new[index[index >= 0]]
+            set_(rgba if collection else tuple(rgba[0]))
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.palette = tuple(palette)
+        return True
+
+    def draw_artists(self) -> None:
+        """Draw the palette artists over the background"""
+
+        for artist in self.artists:
+            self.axes.draw_artist(artist)
+
+    def reset(self) -> None:
+        """Forget the figure, it is drawn again from scratch"""
+
+        self.palette = None
+        self.redraw = None
+        self.axes = None
+        self.artists = []
+        self.slots = None
+        self.background = None
@@ -0,0 +1,436 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Any, Iterator
+import numpy as np
+import pandas as pd
+
+SEARCH_CHUNK: int = 2048  # Subsets scored per worker task
+BOOTSTRAP_CHUNK: int = 50  # Resamples fitted per worker task
+BOOTSTRAP_BYTES: int = 64 * 2 ** 20  # Budget of the resample weights
+BOOTSTRAP_POOL_WORK: int = 10_000_000  # Rows x resamples worth a pool
+
+
+class LinearFit:
+    """This class is an ordinary least squares fit solved from a GramMatrix,
+    it has the coef_ / intercept_ / predict interface of LinearRegression"""
+
+    def __init__(self, target: str, inputs: tuple, coef: np.ndarray,
+                 intercept: float, r2: float, rss: float, n_samples: int):
+        # Set the attributes
+        self.target: str = target  # Predicted column
+        self.inputs: tuple = inputs  # Input columns
+        self.coef_: np.ndarray = coef  # Slope of every input
+        self.intercept_: float = intercept  # Intercept
+        self.r2: float = r2  # Coefficient of determination
+        self.rss: float = rss  # Residual sum of squares
+        self.n_samples: int = n_samples  # Number of rows fitted on
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Predict the target of every row of X"""
+
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+class GramMatrix:
+    """This class holds the cross-products of all numeric columns
+
+    It is built in one pass over the rows. Any OLS fit with an intercept on
+    any subset of the columns is then solved from this small matrix without
+    touching the rows again. The columns are centered first, which is the
+    intercept column of X'X eliminated up front and keeps the system well
+    conditioned (LinearRegression centers the same way)."""
+
+    def __init__(self, df: pd.DataFrame):
+        numeric = df.select_dtypes("number")
+        values = numeric.to_numpy(dtype=np.float64)
+
+        # Set the attributes
+        self.columns: list = list(numeric.columns)  # Column order
+        self.positions: dict = {name: i for i, name in
+                                enumerate(self.columns)}
+        self.n_samples: int = len(values)  # Number of rows
+        self.means: np.ndarray = values.mean(axis=0) if len(values) \
+            else np.zeros(len(self.columns))  # Column means
+        centered = values - self.means
+        self.cross: np.ndarray = centered.T @ centered  # Centered X'X
+
+    def get_index(self, columns: Any) -> np.ndarray:
+        """Get the matrix positions of columns"""
+
+        try:
+            return np.array([self.positions[name] for name in columns],
+                            dtype=np.intp)
+        except KeyError as error:
+            raise KeyError(f"{error.args[0]} is not a numeric column") \
+                from None
+
+    def fit(self, target: str, inputs: Any) -> LinearFit:
+        """Solve the OLS fit of the target on the inputs"""
+
+        inputs = tuple(inputs)
+        t = self.positions[target]
+        s = self.get_index(inputs)
+        xx = self.cross[np.ix_(s, s)]
+        xy = self.cross[s, t]
+        # lstsq gives the minimum norm solution when inputs are collinear
+        coef = np.linalg.lstsq(xx, xy, rcond=None)[0]
+        intercept = float(self.means[t] - self.means[s] @ coef)
+
+        tss = float(self.cross[t, t])
+        rss = max(tss - float(coef @ xy), 0.0)
+        r2 = 1.0 - rss / tss if tss > 0 else 0.0
+        return LinearFit(target, inputs, coef, intercept, r2, rss,
+                         self.n_samples)
+
+
+class FoldMoments:
+    """This class holds the moments of the numeric columns for every fold
+
+    The rows are split into folds once, with a fixed seed. The training
+    moments of a fold are the totals minus that fold and the held-out error
+    is a quadratic form of the fold moments, so every cross-validated fit of
+    every column subset is solved from p x p matrices without the rows."""
+
+    def __init__(self, df: pd.DataFrame, folds: int = 5, seed: int = 0):
+        numeric = df.select_dtypes("number")
+        values = numeric.to_numpy(dtype=np.float64)
+        n_samples = len(values)
+        folds = max(2, min(folds, n_samples))
+        shift = values.mean(axis=0) if n_samples \
+            else np.zeros(values.shape[1])
+        values = values - shift  # Keeps the raw moments well conditioned
+        fold_of = np.random.default_rng(seed).permutation(n_samples) % folds
+
+        # Set the attributes
+        self.columns: list = list(numeric.columns)  # Column order
+        self.positions: dict = {name: i for i, name in
+                                enumerate(self.columns)}
+        self.n_samples: int = n_samples  # Number of rows
+        self.folds: int = folds  # Number of folds
+        self.seed: int = seed  # Seed of the fold split
+        self.shift: np.ndarray = shift  # Column means removed from the rows
+        self.counts: np.ndarray = np.bincount(
+            fold_of, minlength=folds).astype(np.float64)  # Rows per fold
+        self.sums: np.ndarray = np.stack(
+            [values[fold_of == f].sum(axis=0) for f in range(folds)])
+        self.cross: np.ndarray = np.stack(
+            [values[fold_of == f].T @ values[fold_of == f]
+             for f in range(folds)])  # Raw X'X per fold
+
+    def get_index(self, columns: Any) -> np.ndarray:
+        """Get the matrix positions of columns"""
+
+        try:
+            return np.array([self.positions[name] for name in columns],
+                            dtype=np.intp)
+        except KeyError as error:
+            raise KeyError(f"{error.args[0]} is not a numeric column") \
+                from None
+
+    def score(self, target: str, subsets: list) -> pd.DataFrame:
+        """Score subsets of input columns as predictors of the target"""
+
+        t = self.positions[target]
+        rows = []
+        by_size: dict = {}
+        for subset in subsets:
+            by_size.setdefault(len(subset), []).append(tuple(subset))
+        for size, group in by_size.items():
+            rows.append(self._score_group(t, group, size))
+        if not rows:
+            return pd.DataFrame(columns=SEARCH_COLUMNS)
+        return pd.concat(rows, ignore_index=True)
+
+    def cross_validate(self, target: str, inputs: Any) -> np.ndarray:
+        """Get the held-out RMSE of every fold of one model"""
+
+        idx = self.get_index(inputs)[None, :]
+        sse = self._fold_errors(self.positions[target], idx)[:, 0]
+        return np.sqrt(np.maximum(sse, 0.0) / np.maximum(self.counts, 1))
+
+    def _fold_errors(self, t: int, idx: np.ndarray) -> np.ndarray:
+        """Held-out squared error of every fold (rows) and subset (columns)
+        of idx, each fold fitted on the moments of the other folds"""
+
+        count, sums, cross = self.counts.sum(), self.sums.sum(axis=0), \
+            self.cross.sum(axis=0)
+        sse = np.zeros((self.folds, len(idx)))
+        for f in range(self.folds):
+            b, c, _, _ = solve_batch(count - self.counts[f],
+                                     sums - self.sums[f],
+                                     cross - self.cross[f], t, idx)
+            fs, fx = self.sums[f], self.cross[f]
+            sxx = fx[idx[:, :, None], idx[:, None, :]]
+            sse[f] = (fx[t, t] - 2 * np.einsum("mi,mi->m", b, fx[idx, t])
+                      + np.einsum("mi,mij,mj->m", b, sxx, b)
+                      - 2 * c * (fs[t] - np.einsum("mi,mi->m", b, fs[idx]))
+                      + self.counts[f] * c ** 2)
+        return sse
+
+    def _score_group(self, t: int, subsets: list, size: int) -> pd.DataFrame:
+        """Score subsets of one size with batched solves"""
+
+        idx = np.array([self.get_index(subset) for subset in subsets],
+                       dtype=np.intp).reshape(len(subsets), size)
+        n = self.n_samples
+        count, sums, cross = self.counts.sum(), self.sums.sum(axis=0), \
+            self.cross.sum(axis=0)
+        _, _, rss, tss = solve_batch(count, sums, cross, t, idx)
+
+        sse = self._fold_errors(t, idx).sum(axis=0)
+
+        r2 = np.where(tss > 0, 1.0 - rss / np.where(tss > 0, tss, 1.0), 0.0)
+        dof = n - size - 1
+        adj = 1.0 - (1.0 - r2) * (n - 1) / dof if dof > 0 \
+            else np.full(len(subsets), np.nan)
+        aic = n * np.log(np.maximum(rss, 1e-300) / max(n, 1)) \
+            + 2 * (size + 1)
+        return pd.DataFrame({
+            "Inputs": [", ".join(subset) for subset in subsets],
+            "Size": size,
+            "R2": r2,
+            "Adj_R2": adj,
+            "AIC": aic,
+            "CV_RMSE": np.sqrt(np.maximum(sse, 0.0) / max(n, 1)),
+        })
+
+
+SEARCH_COLUMNS: list = ["Inputs", "Size", "R2", "Adj_R2", "AIC", "CV_RMSE"]
+SEARCH_ORDER: dict = {"AIC": True, "CV_RMSE": True,
+                      "Adj_R2": False, "R2": False}  # Rank -> ascending
+
+
+def solve_batch(count: float, sums: np.ndarray, cross: np.ndarray, t: int,
+                idx: np.ndarray) -> tuple:
+    """Solve the OLS fits of the target on every row of idx from raw
+    moments, return (coefs, intercepts, residual and total sum of squares)"""
+
+    mean = sums / count if count else np.zeros_like(sums)
+    centered = cross - count * np.outer(mean, mean)
+    xx = centered[idx[:, :, None], idx[:, None, :]]
+    xy = centered[idx, t]
+    try:
+        coef = np.linalg.solve(xx, xy[:, :, None])[:, :, 0]
+    except np.linalg.LinAlgError:
+        # pinv gives the minimum norm solution when inputs are collinear
+        coef = (np.linalg.pinv(xx) @ xy[:, :, None])[:, :, 0]
+    intercept = mean[t] - np.einsum("mi,mi->m", coef, mean[idx])
+    tss = centered[t, t]
+    rss = np.maximum(tss - np.einsum("mi,mi->m", coef, xy), 0.0)
+    return coef, intercept, rss, np.full(len(idx), tss)
+
+
+def rank_models(table: pd.DataFrame, rank_by: str = "AIC") -> pd.DataFrame:
+    """Sort a table of scored models, the best first"""
+
+    if rank_by not in SEARCH_ORDER:
+        raise ValueError(f"Cannot rank by {rank_by}, use one of "
+                         f"{', '.join(SEARCH_ORDER)}")
+    return table.sort_values(rank_by, ascending=SEARCH_ORDER[rank_by],
+                             kind="stable").reset_index(drop=True)
+
+
+def iter_subsets(candidates: list, max_size: int) -> Iterator:
+    """Yield every subset of the candidates with 1 to max_size columns"""
+
+    for size in range(1, min(max_size, len(candidates)) + 1):
+        yield from combinations(candidates, size)
+
+
+def _score_chunk(moments: FoldMoments, target: str,
+                 subsets: list) -> pd.DataFrame:
+    """Worker task, module level so the process pool can pickle it"""
+
+    return moments.score(target, subsets)
+
+
+def search_subsets(moments: FoldMoments, target: str, candidates: list,
+                   max_size: int = 3, rank_by: str = "AIC",
+                   workers: int = None) -> pd.DataFrame:
+    """Score every subset of the candidates up to max_size columns
+
+    Subsets are scored in chunks; when there is more than one chunk they
+    are spread over a process pool (workers=1 keeps it in this process)."""
+
+    candidates = [name for name in candidates if name != target]
+    subsets = list(iter_subsets(candidates, max_size))
+    chunks = [subsets[start:start + SEARCH_CHUNK]
+              for start in range(0, len(subsets), SEARCH_CHUNK)]
+    if len(chunks) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tables = list(pool.map(_score_chunk,
+                                   [moments] * len(chunks),
+                                   [target] * len(chunks), chunks))
+    else:
+        tables = [moments.score(target, chunk) for chunk in chunks]
+    table = pd.concat(tables, ignore_index=True) if tables \
+        else pd.DataFrame(columns=SEARCH_COLUMNS)
+    return rank_models(table, rank_by)
+
+
+def search_stepwise(moments: FoldMoments, target: str, candidates: list,
+                    direction: str = "forward", max_size: int = None,
+                    rank_by: str = "AIC") -> pd.DataFrame:
+    """Add (forward) or drop (backward, from every column) one column at a
+    time while the ranking criterion improves and the model has at most
+    max_size columns, return the model chosen at every step"""
+
+    if direction not in ("forward", "backward"):
+        raise ValueError(f"Unknown direction {direction}, "
+                         f"use forward or backward")
+    candidates = [name for name in candidates if name != target]
+    max_size = len(candidates) if max_size is None else max_size
+    ascending = SEARCH_ORDER.get(rank_by, True)
+    if direction == "forward":
+        current, steps, best = [], [], None
+    else:
+        current = candidates
+        steps = [moments.score(target, [current])]
+        best = steps[0][rank_by].iloc[0]
+
+    while True:
+        if direction == "forward":
+            options = [current + [name] for name in candidates
+                       if name not in current] \
+                if len(current) < max_size else []
+        else:
+            options = [[name for name in current if name != drop]
+                       for drop in current] if len(current) > 1 else []
+        if not options:
+            break
+        table = rank_models(moments.score(target, options), rank_by)
+        value = table[rank_by].iloc[0]
+        oversized = direction == "backward" and len(current) > max_size
+        if not oversized and best is not None and \
+                not (value < best if ascending else value > best):
+            break
+        best = value
+        by_name = {", ".join(option): option for option in options}
+        current = by_name[table["Inputs"].iloc[0]]
+        steps.append(table.iloc[:1])
+
+    if direction == "backward":  # Models above max_size were only a path
+        steps = [step for step in steps if step["Size"].iloc[0] <= max_size]
+    if not steps:
+        return pd.DataFrame(columns=SEARCH_COLUMNS)
+    return rank_models(pd.concat(steps, ignore_index=True), rank_by)
+
+
+class ModelUncertainty:
+    """This class holds the cross-validated error and the bootstrap fits of
+    one LinearFit, the confidence intervals are percentiles of the fits"""
+
+    def __init__(self, fit: LinearFit, fold_rmse: np.ndarray,
+                 fold_counts: np.ndarray, coefs: np.ndarray,
+                 intercepts: np.ndarray, seed: int):
+        # Set the attributes
+        self.fit: LinearFit = fit  # Model fitted on every row
+        self.fold_rmse: np.ndarray = fold_rmse  # Held-out RMSE per fold
+        self.fold_counts: np.ndarray = fold_counts  # Held-out rows per fold
+        self.coefs: np.ndarray = coefs  # Slopes of every resample
+        self.intercepts: np.ndarray = intercepts  # Intercept per resample
+        self.seed: int = seed  # Seed of the resamples
+
+    @property
+    def cv_rmse(self) -> float:
+        """Held-out RMSE of every row, the squared errors of all folds
+        pooled like the CV_RMSE of the model search"""
+
+        sse = (self.fold_rmse ** 2 * self.fold_counts).sum()
+        return float(np.sqrt(sse / max(self.fold_counts.sum(), 1)))
+
+    @property
+    def n_boot(self) -> int:
+        """Number of bootstrap resamples"""
+
+        return len(self.intercepts)
+
+    def coef_interval(self, level: float = 0.95) -> pd.DataFrame:
+        """Get the estimate and the confidence interval of every
+        coefficient"""
+
+        tail = (1.0 - level) / 2 * 100
+        params = np.column_stack([self.coefs, self.intercepts])
+        lower, upper = np.percentile(params, [tail, 100 - tail], axis=0)
+        return pd.DataFrame(
+            {"Estimate": [*self.fit.coef_, self.fit.intercept_],
+             "Lower": lower, "Upper": upper},
+            index=[*self.fit.inputs, "Intercept"])
+
+    def predict_interval(self, X: Any, level: float = 0.95) -> tuple:
+        """Get the (lower, upper) confidence bounds of the mean prediction
+        of every row of X"""
+
+        tail = (1.0 - level) / 2 * 100
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        predictions = X @ self.coefs.T + self.intercepts  # rows x resamples
+        lower, upper = np.percentile(predictions, [tail, 100 - tail], axis=1)
+        return lower, upper
+
+
+def _bootstrap_chunk(values: np.ndarray, seeds: list) -> tuple:
+    """Fit the resamples of some seeds, the target is column 0 of values
+
+    Worker task, module level so the process pool can pickle it. A
+    resample is a vector of row counts, so its moments are two weighted
+    sums over the rows and its fit is one small solve."""
+
+    n, p = values.shape
+    products = (values[:, :, None] * values[:, None, :]).reshape(n, p * p)
+    sums = np.empty((len(seeds), p))
+    cross = np.empty((len(seeds), p * p))
+    batch = max(1, BOOTSTRAP_BYTES // (8 * max(n, 1)))
+    for start in range(0, len(seeds), batch):
+        stop = min(start + batch, len(seeds))
+        weights = np.empty((stop - start, n))
+        for i, seed in enumerate(seeds[start:stop]):
+            rows = np.random.default_rng(seed).integers(0, n, n)
+            weights[i] = np.bincount(rows, minlength=n)
+        sums[start:stop] = weights @ values
+        cross[start:stop] = weights @ products
+    cross = cross.reshape(len(seeds), p, p)
+
+    mean = sums / n
+    centered = cross - n * mean[:, :, None] * mean[:, None, :]
+    xx, xy = centered[:, 1:, 1:], centered[:, 1:, 0]
+    try:
+        coef = np.linalg.solve(xx, xy[:, :, None])[:, :, 0]
+    except np.linalg.LinAlgError:
+        coef = (np.linalg.pinv(xx) @ xy[:, :, None])[:, :, 0]
+    intercept = mean[:, 0] - np.einsum("bi,bi->b", coef, mean[:, 1:])
+    return coef, intercept
+
+
+def bootstrap(df: pd.DataFrame, target: str, inputs: Any,
+              n_boot: int = 1000, seed: int = 0,
+              workers: int = None) -> tuple:
+    """Refit the model on n_boot resamples of the rows, return the
+    (coefs, intercepts) of every resample
+
+    Every resample has its own seed spawned from seed, so the result does
+    not depend on how the resamples are spread over the process pool, which
+    is only started for more than BOOTSTRAP_POOL_WORK rows x resamples."""
+
+    inputs = list(inputs)
+    values = df[[target, *inputs]].to_numpy(dtype=np.float64)
+    shift = values.mean(axis=0) if len(values) \
+        else np.zeros(values.shape[1])
+    values = values - shift  # Keeps the raw moments well conditioned
+    seeds = np.random.SeedSequence(seed).spawn(n_boot)
+    chunks = [seeds[start:start + BOOTSTRAP_CHUNK]
+              for start in range(0, n_boot, BOOTSTRAP_CHUNK)]
+    # Below the threshold starting the pool costs more than it saves
+    if len(chunks) > 1 and workers != 1 \
+            and len(values) * n_boot >= BOOTSTRAP_POOL_WORK:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_bootstrap_chunk,
+                                  [values] * len(chunks), chunks))
+    else:
+        parts = [_bootstrap_chunk(values, chunk) for chunk in chunks]
+    if not parts:
+        return np.empty((0, len(inputs))), np.empty(0)
+
+    coefs = np.concatenate([part[0] for part in parts])
+    intercepts = np.concatenate([part[1] for part in parts]) \
+        + shift[0] - coefs @ shift[1:]
+    return coefs, intercepts
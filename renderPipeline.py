@@ -0,0 +1,177 @@
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from matplotlib import rcParams
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+from plotCache import PlotCache
+from recolorer import Recolorer
+
+
+class RenderCancelled(Exception):
+    """A newer plot was asked for before this one was finished"""
+
+
+class RenderJob:
+    """This class is one plot request going through the RenderPipeline"""
+
+    def __init__(self, prepare: Callable, draw: Callable,
+                 spec: tuple = None, palette: tuple = None,
+                 redraw: Callable = None):
+        # Set the attributes
+        self.prepare: Callable = prepare  # () -> data, no Tk calls
+        self.draw: Callable = draw  # (figure, data) -> None
+        self.spec: Optional[tuple] = spec  # Plot without its palette
+        self.palette: Optional[tuple] = palette  # Colours, can be swapped
+        self.redraw: Optional[Callable] = redraw  # (figure, palette) -> None
+        self.key: Optional[tuple] = None  # Cache key, None to not cache
+        self.cancelled: bool = False  # Set when a newer job was submitted
+        self.future: Optional[Future] = None  # Result, a PIL image
+
+    def cancel(self) -> None:
+        """Stop the job at its next stage boundary"""
+
+        self.cancelled = True
+        if self.future:
+            self.future.cancel()  # Only works if it has not started
+
+    def check(self) -> None:
+        """Raise RenderCancelled if the job was cancelled"""
+
+        if self.cancelled:
+            raise RenderCancelled
+
+
+class RenderPipeline:
+    """This class renders plots on a worker thread, the newest one wins
+
+    A plot is a prepare stage (aggregations, graphs, layouts) and a draw
+    stage that draws the prepared data on a figure rasterized by Agg. Both
+    run on one worker thread that owns the figure, so the Tk thread only
+    receives the finished image. Submitting a plot cancels the one before,
+    which stops at its next stage boundary. Plots submitted with a spec
+    are kept in a PlotCache, a cached plot is not rendered again. A plot
+    with the spec of the plot on the figure and only another palette is
+    recoloured in place instead of being drawn again."""
+
+    def __init__(self, figsize: tuple = (7, 5), dpi: int = 100,
+                 facecolor: str = "gray", cache: PlotCache = None):
+        # Set the attributes
+        self.figure: Figure = Figure(figsize=figsize, dpi=dpi)  # Reused
+        self.canvas: FigureCanvasAgg = FigureCanvasAgg(self.figure)
+        self.facecolor: str = facecolor  # Background of every plot
+        self.cache: Optional[PlotCache] = cache  # Rendered plots by spec
+        self.recolorer: Recolorer = Recolorer(self.canvas)
+        self._drawn: Optional[tuple] = None  # Spec of the figure, if any
+        self._job: Optional[RenderJob] = None  # Latest submitted job
+        self._lock: threading.Lock = threading.Lock()
+        self._worker: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="render")
+
+    def submit(self, prepare: Callable, draw: Callable,
+               spec: tuple = None, palette: tuple = None,
+               redraw: Callable = None) -> RenderJob:
+        """Render a plot on the worker, cancelling the previous one, a plot
+        cached in memory under its spec and palette is finished right
+        away. redraw draws the plot in another palette, the Recolorer
+        finds the colours to swap with it."""
+
+        job = RenderJob(prepare, draw, spec, palette, redraw)
+        job.key = self.get_key(spec, palette)
+        image = self.cache.get(job.key, disk=False) \
+            if self.cache and job.key else None
+        with self._lock:
+            if self._job:
+                self._job.cancel()
+            self._job = job
+            if image is not None:
+                job.future = Future()
+                job.future.set_result(image)
+            else:
+                job.future = self._worker.submit(self.render, job)
+        return job
+
+    def get_key(self, spec: Optional[tuple],
+                palette: Optional[tuple]) -> Optional[tuple]:
+        """Add the palette, figure size and colour to the spec of a plot"""
+
+        if spec is None:
+            return None
+        return (*spec, palette, tuple(self.figure.get_size_inches()),
+                self.figure.dpi, self.facecolor)
+
+    def render(self, job: RenderJob) -> Image.Image:
+        """Recolour the figure or run both stages of a job, and rasterize
+        the figure"""
+
+        if self.cache and job.key:
+            image = self.cache.get(job.key)  # Maybe on disk
+            if image is not None:
+                return image
+        image = self.recolor(job)
+        if image is None:
+            image = self.rasterize(job)
+        if self.cache and job.key:
+            self.cache.put(job.key, image)
+        return image
+
+    def recolor(self, job: RenderJob) -> Optional[Image.Image]:
+        """Swap the palette of the plot on the figure if that is all the
+        job changes, None if it is another plot"""
+
+        job.check()
+        if job.spec is None or job.palette is None \
+                or job.spec != self._drawn \
+                or not self.recolorer.apply(job.palette):
+            return None
+        return self.get_image()
+
+    def rasterize(self, job: RenderJob) -> Image.Image:
+        """Draw a job on the figure and rasterize it"""
+
+        job.check()
+        data = job.prepare()
+        job.check()
+        self._drawn = None
+        self.recolorer.reset()
+        self.figure.clf()
+        # clf keeps the margins a tight_layout set, a reused figure would
+        # draw every later plot with them
+        self.figure.subplots_adjust(**{
+            name: rcParams[f"figure.subplot.{name}"]
+            for name in ("left", "right", "bottom", "top", "wspace",
+                         "hspace")})
+        job.draw(self.figure, data)
+        self.figure.set_facecolor(self.facecolor)
+        job.check()
+        if not (job.palette and self.recolorer.capture(job.palette,
+                                                       job.redraw)):
+            self.canvas.draw()
+        self._drawn = job.spec
+        return self.get_image()
+
+    def get_image(self) -> Image.Image:
+        """Copy the pixels of the canvas"""
+
+        width, height = self.canvas.get_width_height()
+        return Image.frombuffer("RGBA", (width, height),
+                                bytes(self.canvas.buffer_rgba()), "raw",
+                                "RGBA", 0, 1)
+
+    def shutdown(self) -> None:
+        """Cancel the current job and stop the worker"""
+
+        with self._lock:
+            if self._job:
+                self._job.cancel()
+        self._worker.shutdown(wait=False)
+
+    @staticmethod
+    def get_result(job: RenderJob) -> Any:
+        """Get the image of a finished job, None if it was cancelled"""
+
+        try:
+            return job.future.result()
+        except (CancelledError, RenderCancelled):  # Before or while running
+            return None
@@ -0,0 +1,154 @@
+from collections import OrderedDict
+from tkinter import ttk
+from typing import Any, Callable, Optional
+import numpy as np
+
+
+class TreeTable(ttk.Treeview):
+    """This class is a Treeview that only materializes the visible rows
+
+    Items are keyed by a stable row id (the row position in the dataset), so
+    moving the window or changing the query only detaches the rows that leave
+    the screen and inserts the ones that enter it. Detached items are kept in
+    a bounded pool and re-attached without fetching them again."""
+
+    def __init__(self, parent, page_size: int = 20, pool_size: int = 200,
+                 on_sort: Callable = None, **kwargs):
+        super().__init__(parent, show="headings", height=page_size, **kwargs)
+
+        # Set the attributes
+        self.page_size: int = page_size  # Number of rows on screen
+        self.pool_size: int = pool_size  # Detached items kept for reuse
+        self.keys: np.ndarray = np.empty(0, dtype=np.int64)  # Row ids
+        self.offset: int = 0  # Data row shown at the top
+        self.version: Any = None  # Data version the items were built from
+        self.fetch: Optional[Callable] = None  # row ids -> rows
+        self.on_sort: Optional[Callable] = on_sort  # Heading click callback
+        self._pool: OrderedDict = OrderedDict()  # Detached item ids
+
+        # Set the widgets, the scrollbar moves through the data, not the tree
+        self.scrollbar: ttk.Scrollbar = ttk.Scrollbar(parent,
+                                                      orient="vertical",
+                                                      command=self.scroll)
+        self.bind("<MouseWheel>", self.on_wheel)
+        self.bind("<Button-4>", self.on_wheel)
+        self.bind("<Button-5>", self.on_wheel)
+
+    @property
+    def row_count(self) -> int:
+        """Number of rows in the data"""
+
+        return len(self.keys)
+
+    def set_data(self, columns: tuple, keys: np.ndarray, fetch: Callable,
+                 version: Any = None) -> None:
+        """Show new data, fetch(row ids) returns the rows of those ids"""
+
+        if version != self.version or \
+                tuple(self["columns"]) != tuple(columns):
+            self.clear()
+            self.configure(columns=columns)
+            for column in columns:
+                self.heading(column, text=column,
+                             command=lambda col=column: self.sort_by(col))
+                self.column(column, width=98, anchor="center")
+
+        self.keys = np.asarray(keys)
+        self.fetch = fetch
+        self.version = version
+        self.offset = 0
+        self.render()
+
+    def sort_by(self, column: str) -> None:
+        """Heading click, let the owner sort the data"""
+
+        if self.on_sort:
+            self.on_sort(column)
+
+    def show_sort(self, column: str = None, descending: bool = False) -> None:
+        """Mark the sorted column heading with an arrow"""
+
+        for name in self["columns"]:
+            arrow = (" ▼" if descending else " ▲") if name == column else ""
+            self.heading(name, text=f"{name}{arrow}")
+
+    def clear(self) -> None:
+        """Delete every item, attached or pooled"""
+
+        items = (*self.get_children(), *self._pool)
+        if items:
+            self.delete(*items)
+        self._pool.clear()
+
+    def scroll(self, action: str, value: str, unit: str = None) -> None:
+        """Scrollbar command, moves the window over the data"""
+
+        if action == "moveto":
+            offset = int(float(value) * self.row_count)
+        else:
+            step = self.page_size if unit == "pages" else 1
+            offset = self.offset + int(value) * step
+        self.move_to(offset)
+
+    def on_wheel(self, event) -> str:
+        """Scroll three rows per mouse wheel notch"""
+
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.move_to(self.offset - 3)
+        else:
+            self.move_to(self.offset + 3)
+        return "break"
+
+    def move_to(self, offset: int) -> None:
+        """Show the rows starting at an offset"""
+
+        offset = max(0, min(offset, self.row_count - self.page_size))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def render(self) -> None:
+        """Bring the items in line with the visible window of rows"""
+
+        stop = min(self.offset + self.page_size, self.row_count)
+        keys = self.keys[self.offset:stop]
+        visible = [str(key) for key in keys]
+        wanted = set(visible)
+
+        # Rows leaving the screen go to the pool
+        attached = self.get_children()
+        leaving = [iid for iid in attached if iid not in wanted]
+        if leaving:
+            self.detach(*leaving)
+            self._pool.update((iid, None) for iid in leaving)
+
+        # Rows entering the screen come from the pool or are fetched
+        current = [iid for iid in attached if iid in wanted]
+        known = set(current)
+        missing = [i for i, iid in enumerate(visible)
+                   if iid not in self._pool and iid not in known]
+        if missing and self.fetch:
+            rows = self.fetch(keys[missing])
+            for i, row in zip(missing, rows):
+                self.insert(parent="", index="end", iid=visible[i],
+                            values=row)
+                current.append(visible[i])
+
+        # Rows already in place are left alone, the others are moved there
+        for index, iid in enumerate(visible):
+            if index < len(current) and current[index] == iid:
+                continue
+            self.move(iid, "", index)
+            self._pool.pop(iid, None)
+            if iid in current:
+                current.remove(iid)
+            current.insert(index, iid)
+
+        while len(self._pool) > self.pool_size:
+            self.delete(self._pool.popitem(last=False)[0])
+
+        if self.row_count:
+            self.scrollbar.set(self.offset / self.row_count,
+                               stop / self.row_count)
+        else:
+            self.scrollbar.set(0, 1)